@@ -0,0 +1,44 @@
+"""news search vector
+
+Revision ID: 3c9e41d7a2b8
+Revises: fbc31dd635ad
+Create Date: 2026-10-18 13:21:47.560912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e41d7a2b8'
+down_revision: Union[str, None] = 'fbc31dd635ad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    # Adding a stored generated column rewrites the table under an exclusive lock
+    op.add_column(
+        'news',
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True), nullable=True),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_news_search_vector', 'news', ['search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_news_search_vector', table_name='news', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('news', 'search_vector')
@@ -0,0 +1,36 @@
+"""comment default partition
+
+Revision ID: 5e0b8a3f6d21
+Revises: c47a0e9f13d6
+Create Date: 2026-10-18 16:20:41.512903
+
+Comments created outside of every monthly partition (e.g. when the
+partition task did not run for COMMENT_PARTITIONS_AHEAD months) land in the
+default partition instead of failing. create_partitions moves them into
+their monthly partition once it is created.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0b8a3f6d21'
+down_revision: Union[str, None] = 'c47a0e9f13d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE TABLE comment_default PARTITION OF comment DEFAULT")
+
+
+def downgrade() -> None:
+    rows = op.get_bind().execute(sa.text("SELECT count(*) FROM comment_default")).scalar()
+    if rows:
+        raise RuntimeError(
+            f"comment_default holds {rows} comments, create their monthly partitions before downgrading"
+        )
+    op.execute("DROP TABLE comment_default")
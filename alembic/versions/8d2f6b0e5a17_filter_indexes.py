@@ -0,0 +1,48 @@
+"""filter indexes
+
+Revision ID: 8d2f6b0e5a17
+Revises: 3c9e41d7a2b8
+Create Date: 2026-10-18 14:02:15.774390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f6b0e5a17'
+down_revision: Union[str, None] = '3c9e41d7a2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Composite indexes serve both the filter and the keyset ordering,
+# and replace the single column foreign key indexes
+INDEXES = [
+    ('ix_news_updated', 'news', ['updated', 'id']),
+    ('ix_news_category_created', 'news', ['category_id', 'created', 'id']),
+    ('ix_comment_user_created', 'comment', ['user_id', 'created', 'id']),
+]
+
+REPLACED = [
+    ('ix_news_category_id', 'news', ['category_id']),
+    ('ix_comment_user_id', 'comment', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, _ in REPLACED:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REPLACED:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
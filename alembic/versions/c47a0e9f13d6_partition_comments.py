@@ -0,0 +1,96 @@
+"""partition comments
+
+Revision ID: c47a0e9f13d6
+Revises: 8d2f6b0e5a17
+Create Date: 2026-10-18 15:11:52.308145
+
+Rebuilds comment as a table range partitioned by created month.
+Rows are copied into the new table, so comment writes are blocked while the
+migration runs; schedule it in a maintenance window on large tables.
+Further partitions are created by the tasks.manage_comment_partitions Celery task.
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47a0e9f13d6'
+down_revision: Union[str, None] = '8d2f6b0e5a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONTHS_AHEAD = 3
+
+INDEXES = [
+    ('ix_comment_news_id', ['news_id', 'created', 'id']),
+    ('ix_comment_created', ['created', 'id']),
+    ('ix_comment_user_created', ['user_id', 'created', 'id']),
+]
+
+COLUMNS = "id, content, created, updated, news_id, user_id"
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_comment_table(partitioned: bool) -> None:
+    op.execute(f"""
+        CREATE TABLE comment (
+            id integer NOT NULL DEFAULT nextval('comment_id_seq'),
+            content varchar(2500) NOT NULL,
+            created timestamp without time zone NOT NULL,
+            updated timestamp without time zone NOT NULL,
+            news_id integer NOT NULL REFERENCES news (id) ON DELETE CASCADE,
+            user_id uuid NOT NULL REFERENCES "user" (id) ON DELETE CASCADE,
+            PRIMARY KEY ({'id, created' if partitioned else 'id'})
+        ) {'PARTITION BY RANGE (created)' if partitioned else ''}
+    """)
+    op.execute("ALTER SEQUENCE comment_id_seq OWNED BY comment.id")
+
+
+def replace_comment_table(partitioned: bool) -> None:
+    op.execute("ALTER TABLE comment RENAME TO comment_old")
+    op.execute("ALTER TABLE comment_old RENAME CONSTRAINT comment_pkey TO comment_old_pkey")
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_old")
+
+    create_comment_table(partitioned)
+
+    if partitioned:
+        first = op.get_bind().execute(sa.text("SELECT min(created) FROM comment_old")).scalar()
+        month = add_months(min(first.date(), date.today()) if first else date.today(), 0)
+        while month <= add_months(date.today(), MONTHS_AHEAD):
+            op.execute(
+                f"CREATE TABLE comment_p{month:%Y_%m} PARTITION OF comment "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            )
+            month = add_months(month, 1)
+
+    # Copied before the counter trigger exists, counters are already correct
+    op.execute(f"INSERT INTO comment ({COLUMNS}) SELECT {COLUMNS} FROM comment_old")
+    op.execute("DROP TABLE comment_old")
+
+    for name, columns in INDEXES:
+        op.create_index(name, 'comment', columns)
+
+    op.execute("""
+        CREATE TRIGGER comment_comment_count
+        AFTER INSERT OR DELETE OR UPDATE OF news_id ON comment
+        FOR EACH ROW EXECUTE FUNCTION comment_comment_count()
+    """)
+
+
+def upgrade() -> None:
+    replace_comment_table(partitioned=True)
+
+
+def downgrade() -> None:
+    # Partitions are dropped together with the partitioned table
+    replace_comment_table(partitioned=False)
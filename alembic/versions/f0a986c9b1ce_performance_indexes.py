@@ -0,0 +1,40 @@
+"""performance indexes
+
+Revision ID: f0a986c9b1ce
+Revises: 07ced34f38e9
+Create Date: 2026-10-18 10:12:31.402518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0a986c9b1ce'
+down_revision: Union[str, None] = '07ced34f38e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_news_category_id', 'news', ['category_id']),
+    ('ix_news_created', 'news', ['created', 'id']),
+    ('ix_comment_news_id', 'comment', ['news_id', 'created', 'id']),
+    ('ix_comment_user_id', 'comment', ['user_id']),
+    ('ix_comment_created', 'comment', ['created', 'id']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
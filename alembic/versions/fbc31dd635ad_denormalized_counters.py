@@ -0,0 +1,69 @@
+"""denormalized counters
+
+Revision ID: fbc31dd635ad
+Revises: f0a986c9b1ce
+Create Date: 2026-10-18 12:40:08.113204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fbc31dd635ad'
+down_revision: Union[str, None] = 'f0a986c9b1ce'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (counter table, counter column, child table, foreign key column)
+COUNTERS = [
+    ('news', 'comment_count', 'comment', 'news_id'),
+    ('category', 'news_count', 'news', 'category_id'),
+]
+
+
+def upgrade() -> None:
+    for table, counter, child, foreign_key in COUNTERS:
+        op.add_column(table, sa.Column(counter, sa.Integer(), server_default='0', nullable=False))
+
+        # Counters are kept by row triggers, so cascades, bulk statements and
+        # writes bypassing the services stay consistent in the same transaction
+        op.execute(f"""
+            CREATE FUNCTION {child}_{counter}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE' AND NEW.{foreign_key} IS NOT DISTINCT FROM OLD.{foreign_key} THEN
+                    RETURN NULL;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.{foreign_key} IS NOT NULL THEN
+                    UPDATE {table} SET {counter} = {counter} + 1 WHERE id = NEW.{foreign_key};
+                END IF;
+                IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.{foreign_key} IS NOT NULL THEN
+                    UPDATE {table} SET {counter} = {counter} - 1 WHERE id = OLD.{foreign_key};
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {child}_{counter}
+            AFTER INSERT OR DELETE OR UPDATE OF {foreign_key} ON {child}
+            FOR EACH ROW EXECUTE FUNCTION {child}_{counter}()
+        """)
+
+        # CREATE TRIGGER blocks writes to the child table until commit,
+        # so the backfill counts exactly the rows the trigger did not see
+        op.execute(f"""
+            UPDATE {table} SET {counter} = counts.total
+            FROM (SELECT {foreign_key}, count(*) AS total FROM {child} GROUP BY {foreign_key}) AS counts
+            WHERE {table}.id = counts.{foreign_key}
+        """)
+
+
+def downgrade() -> None:
+    for table, counter, child, _ in reversed(COUNTERS):
+        op.execute(f"DROP TRIGGER IF EXISTS {child}_{counter} ON {child}")
+        op.execute(f"DROP FUNCTION IF EXISTS {child}_{counter}()")
+        op.drop_column(table, counter)
@@ -0,0 +1,115 @@
+"""
+Micro-benchmark of DBManager statement caching
+
+Compares per-call statement overhead of building a statement from scratch
+(as DBManager did before) with the cached statements, measuring what
+AsyncSession.execute does before the query is sent: construction,
+cache key generation and the compiled cache lookup.
+
+Usage: python -m benchmarks.statement_cache [iterations]
+"""
+
+import sys
+import uuid
+import timeit
+
+from sqlalchemy import select, update, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import joinedload
+
+import main  # noqa: F401, configures all mappers
+from src.manager import DBManager
+from src.news.models import News, Comment
+
+dialect = postgresql.asyncpg.dialect()
+compiled_cache = {}
+
+
+def prepare(statement) -> None:
+    """
+    Mirrors work done per execution until the compiled statement is found
+    """
+    key = statement._generate_cache_key().key
+    if key not in compiled_cache:
+        compiled_cache[key] = statement.compile(dialect=dialect)
+
+
+def uncached_get_object() -> None:
+    prepare(select(News).where(News.id == 42))
+
+
+def cached_get_object() -> None:
+    prepare(DBManager.select_by(News, "id"))
+
+
+def uncached_get_object_joined() -> None:
+    prepare(select(News).where(News.id == 42).options(joinedload(News.category)))
+
+
+def cached_get_object_joined() -> None:
+    prepare(DBManager.select_by(News, "id", ("category",)))
+
+
+def uncached_get_page() -> None:
+    ordering = [Comment.created, Comment.id]
+    prepare(
+        select(Comment)
+        .where(Comment.news_id == 42)
+        .where(tuple_(*ordering) < tuple_("2026-10-18T00:00:00", 100))
+        .order_by(*[column.desc() for column in ordering])
+        .limit(11)
+    )
+
+
+def cached_get_page() -> None:
+    prepare(DBManager.select_objects(Comment, filters=("news_id",), order_by="-created", keyset=True))
+
+
+def uncached_update_object() -> None:
+    prepare(
+        update(Comment)
+        .where(Comment.id == 42)
+        .values(content="text")
+        .returning(Comment)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+
+def cached_update_object() -> None:
+    prepare(DBManager.update_by(Comment, "id", ("content",)))
+
+
+def uncached_update_owned() -> None:
+    prepare(
+        update(Comment)
+        .where(Comment.id == 42, Comment.user_id == uuid.UUID(int=1))
+        .values(content="text")
+        .returning(Comment)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+
+def cached_update_owned() -> None:
+    prepare(DBManager.update_by(Comment, "id", ("content",), "user_id"))
+
+
+CASES = [
+    ("get_object", uncached_get_object, cached_get_object),
+    ("get_object_joined", uncached_get_object_joined, cached_get_object_joined),
+    ("get_page", uncached_get_page, cached_get_page),
+    ("update_object", uncached_update_object, cached_update_object),
+    ("update_owned", uncached_update_owned, cached_update_owned),
+]
+
+
+def run(iterations: int) -> None:
+    print(f"{'statement':<20}{'uncached, us':>14}{'cached, us':>12}{'speedup':>10}")
+    for name, uncached, cached in CASES:
+        uncached(), cached()
+        before = min(timeit.repeat(uncached, number=iterations, repeat=5)) / iterations * 1e6
+        after = min(timeit.repeat(cached, number=iterations, repeat=5)) / iterations * 1e6
+        print(f"{name:<20}{before:>14.2f}{after:>12.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
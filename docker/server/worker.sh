@@ -1,3 +1,4 @@
 #!/bin/sh
 
-exec celery -A app.src.celery.celery_app worker --loglevel=info
\ No newline at end of file
+cd /app
+exec celery -A src.celery.celery_app worker -B --loglevel=info
\ No newline at end of file
@@ -2,20 +2,40 @@
 Main program module
 """
 
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.openapi.utils import get_openapi
 
 from src.news import routers
 from src.users import users_router
 from src.media import media_router
+from src.metrics import metrics_router
+from src.redis import listen_invalidations
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Runs cache invalidation listener while application is alive
+    """
+    listener = asyncio.create_task(listen_invalidations())
+    yield
+    listener.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await listener
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(router=routers.categories_router)
 app.include_router(router=routers.news_router)
 app.include_router(router=routers.comments_router)
 app.include_router(router=users_router)
 app.include_router(router=media_router)
+app.include_router(router=metrics_router)
 
 
 openapi_schema = get_openapi(
@@ -1,13 +1,27 @@
+import asyncio
 import smtplib
 from email.mime.text import MIMEText
 
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 
 from celery.app import Celery
+from celery.schedules import crontab
 
-from .environs import REDIS_URL, SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD
+from .database import DATABASE_URL
+from .environs import (
+    REDIS_URL, SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD,
+    COMMENT_PARTITIONS_AHEAD, COMMENT_PARTITIONS_RETENTION,
+)
 
 celery_app = Celery("celery", broker=REDIS_URL, backend=REDIS_URL)
+celery_app.conf.beat_schedule = {
+    "manage-comment-partitions": {
+        "task": "tasks.manage_comment_partitions",
+        "schedule": crontab(hour=3, minute=0),
+    },
+}
 
 class TaskStatus(BaseModel):
     id: str
@@ -33,4 +47,59 @@ def send_verification_code(email: str, code: str) -> bool:
         server.sendmail(from_addr=SMTP_USER, to_addrs=email, msg=message.as_string())
         return True
     except smtplib.SMTPAuthenticationError:
-        return False
\ No newline at end of file
+        return False
+
+@celery_app.task(name="tasks.manage_comment_partitions")
+def manage_comment_partitions() -> dict:
+    """
+    Creates comment partitions COMMENT_PARTITIONS_AHEAD months ahead and detaches
+    those older than COMMENT_PARTITIONS_RETENTION months (0 keeps all)
+    """
+    from .news.partitions import create_partitions, detach_partitions
+    from .redis import redis_client
+
+    async def manage() -> dict:
+        # Every task runs in its own event loop, so pooled connections can not be reused
+        engine = create_async_engine(DATABASE_URL, poolclass=NullPool)
+        try:
+            async with engine.begin() as connection:
+                created = await create_partitions(connection, COMMENT_PARTITIONS_AHEAD)
+
+            detached = []
+            if COMMENT_PARTITIONS_RETENTION:
+                async with engine.connect() as connection:
+                    detached = await detach_partitions(connection, COMMENT_PARTITIONS_RETENTION)
+            return {"created": created, "detached": detached}
+        finally:
+            await engine.dispose()
+            # Redis connections are bound to this event loop
+            await redis_client.connection_pool.disconnect()
+
+    return asyncio.run(manage())
+
+
+@celery_app.task(name="tasks.invalidate_deferred_tags")
+def invalidate_deferred_tags(tags: list[str]) -> None:
+    """
+    Invalidates cache tags deferred with src.redis.defer_invalidation
+    """
+    from .redis import invalidate_deferred, redis_client
+
+    async def invalidate() -> None:
+        try:
+            await invalidate_deferred(*tags)
+        finally:
+            # Redis connections are bound to this event loop
+            await redis_client.connection_pool.disconnect()
+
+    asyncio.run(invalidate())
+
+
+@celery_app.task(name="tasks.generate_media_variants")
+def generate_media_variants(paths: list[str]) -> list[str]:
+    """
+    Creates missing resized variants of stored images, returns created paths
+    """
+    from .media.variants import generate_variants
+
+    return [created for path in paths if path for created in generate_variants(path)]
@@ -2,26 +2,183 @@
 Module for database connection
 """
 
-from typing import AsyncGenerator, Any
+import time
+import itertools
+from typing import AsyncGenerator, Any, Callable
 
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
+from fastapi import Request, Response
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .environs import *
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_async_engine(url=DATABASE_URL)
+
+class MonitoredPool(AsyncAdaptedQueuePool):
+    """
+    Connection pool collecting checkout wait statistics
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.max_overflow_used = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+            self.max_overflow_used = max(self.max_overflow_used, self.overflow())
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Current occupancy and accumulated checkout statistics
+        """
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "max_overflow_used": self.max_overflow_used,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_time": self.wait_time / self.checkouts if self.checkouts else 0.0,
+            "max_wait_time": self.max_wait_time,
+        }
+
+
+def create_engine(url: str) -> AsyncEngine:
+    """
+    Creates async engine with pool and statement cache settings from environs
+    """
+    return create_async_engine(
+        url=f"{url}?prepared_statement_cache_size={DB_STATEMENT_CACHE_SIZE}",
+        poolclass=MonitoredPool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={"statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+    )
+
+
+engine = create_engine(DATABASE_URL)
 async_session = async_sessionmaker(bind=engine, expire_on_commit=True)
 
+replica_engines = {
+    host: create_engine(f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{host}/{DB_NAME}")
+    for host in DB_REPLICA_HOSTS
+}
+replica_sessions = [
+    async_sessionmaker(bind=replica_engine, expire_on_commit=True)
+    for replica_engine in replica_engines.values()
+]
+replica_cycle = itertools.cycle(replica_sessions)
+
+PRIMARY_PIN_COOKIE = "db_primary_until"
+
 class Base(DeclarativeBase):
     """
     Meta class for sqlalchemy ORM models
     """
 
-async def get_db() -> AsyncGenerator[Any, AsyncSession]:
+class LazySession():
+    """
+    AsyncSession proxy opening the real session on first use, so requests
+    answered without the database (e.g. cache hits) do no session work
+    """
+
+    def __init__(self, factory: Callable[[], AsyncSession]) -> None:
+        self._factory = factory
+        self._session: AsyncSession | None = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+def is_pinned_to_primary(request: Request) -> bool:
+    """
+    Checks whether client wrote recently and must read its own writes from primary
+    """
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def pin_to_primary(response: Response) -> None:
+    """
+    Makes client read from primary for DB_READ_YOUR_WRITES_WINDOW seconds
     """
-    Courutine for generating db session
+    response.set_cookie(
+        key=PRIMARY_PIN_COOKIE,
+        value=str(time.time() + DB_READ_YOUR_WRITES_WINDOW),
+        max_age=DB_READ_YOUR_WRITES_WINDOW,
+        httponly=True,
+    )
+
+
+def get_read_sessionmaker(request: Request | None = None) -> async_sessionmaker:
+    """
+    Returns next replica sessionmaker, or primary one without replicas
+    or for clients pinned to primary
+    """
+    if not replica_sessions or (request is not None and is_pinned_to_primary(request)):
+        return async_session
+    return next(replica_cycle)
+
+
+async def get_db(response: Response) -> AsyncGenerator[Any, AsyncSession]:
+    """
+    Courutine for generating primary db session \n
+    Clients are pinned to primary for DB_READ_YOUR_WRITES_WINDOW seconds
+    once the session commits, requests failing before a write are not \n
     """
     async with async_session() as session:
+        if replica_sessions and DB_READ_YOUR_WRITES_WINDOW:
+            event.listen(session.sync_session, "after_commit", lambda _: pin_to_primary(response))
+        yield session
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[Any, AsyncSession]:
+    """
+    Courutine for generating read only db session, served by replicas when configured \n
+    Session is lazy and is opened only when a query is run \n
+    """
+    session = LazySession(lambda: get_read_sessionmaker(request)())
+    try:
         yield session
+    finally:
+        await session.close()
+
+
+def get_pool_stats() -> dict[str, dict[str, Any]]:
+    """
+    Returns connection pool statistics of every engine
+    """
+    stats = {"primary": engine.pool.stats()}
+    for host, replica_engine in replica_engines.items():
+        stats[f"replica:{host}"] = replica_engine.pool.stats()
+    return stats
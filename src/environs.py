@@ -14,9 +14,26 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+DB_READ_YOUR_WRITES_WINDOW = int(os.getenv("DB_READ_YOUR_WRITES_WINDOW", "5"))
+
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
 
+CACHE_LOCAL_MAXSIZE = int(os.getenv("CACHE_LOCAL_MAXSIZE", "512"))
+CACHE_LOCAL_TTL = int(os.getenv("CACHE_LOCAL_TTL", "30"))
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "60"))
+CACHE_LOCK_TIMEOUT = int(os.getenv("CACHE_LOCK_TIMEOUT", "10"))
+CACHE_COUNT_TTL = int(os.getenv("CACHE_COUNT_TTL", "60"))
+CACHE_TAG_TTL = int(os.getenv("CACHE_TAG_TTL", str(24 * 60 * 60)))
+
 JWT_SECRET = os.getenv("JWT_SECRET", "SECRET")
 USER_MANAGER_SECRET = os.getenv("USER_MANAGER_SECRET", "SECRET")
 
@@ -26,6 +43,27 @@ SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 
 MEDIA_ROOT = "media/"
+MEDIA_DELIVERY = os.getenv("MEDIA_DELIVERY", "app")
+MEDIA_MAX_FILE_SIZE = int(os.getenv("MEDIA_MAX_FILE_SIZE", str(20 * 1024 * 1024)))
+MEDIA_MAX_REQUEST_SIZE = int(os.getenv("MEDIA_MAX_REQUEST_SIZE", str(100 * 1024 * 1024)))
+MEDIA_IO_WORKERS = int(os.getenv("MEDIA_IO_WORKERS", "4"))
+MEDIA_VARIANTS = {
+    name.strip(): int(width)
+    for name, width in (
+        variant.split(":") for variant in os.getenv("MEDIA_VARIANTS", "thumb:320,medium:960").split(",") if variant.strip()
+    )
+}
+MEDIA_VARIANT_FORMAT = os.getenv("MEDIA_VARIANT_FORMAT", "webp")
+MEDIA_CACHE_MAXSIZE = int(os.getenv("MEDIA_CACHE_MAXSIZE", "1024"))
+MEDIA_CACHE_TTL = int(os.getenv("MEDIA_CACHE_TTL", "60"))
+MEDIA_CACHE_BODY_SIZE = int(os.getenv("MEDIA_CACHE_BODY_SIZE", str(256 * 1024)))
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+NEWS_COMMENTS_PREVIEW_LIMIT = int(os.getenv("NEWS_COMMENTS_PREVIEW_LIMIT", "10"))
+NEWS_COMMENT_COUNT_DELAY = int(os.getenv("NEWS_COMMENT_COUNT_DELAY", "30"))
+
+COMMENT_PARTITIONS_AHEAD = int(os.getenv("COMMENT_PARTITIONS_AHEAD", "3"))
+COMMENT_PARTITIONS_RETENTION = int(os.getenv("COMMENT_PARTITIONS_RETENTION", "0"))
 
 __all__ = [
     "DB_NAME",
@@ -33,11 +71,39 @@ __all__ = [
     "DB_PASSWORD",
     "DB_HOST",
     "DB_PORT",
+    "DB_POOL_SIZE",
+    "DB_MAX_OVERFLOW",
+    "DB_POOL_TIMEOUT",
+    "DB_POOL_RECYCLE",
+    "DB_POOL_PRE_PING",
+    "DB_STATEMENT_CACHE_SIZE",
+    "DB_REPLICA_HOSTS",
+    "DB_READ_YOUR_WRITES_WINDOW",
     "JWT_SECRET",
     "USER_MANAGER_SECRET",
     "MEDIA_ROOT",
+    "MEDIA_DELIVERY",
+    "MEDIA_MAX_FILE_SIZE",
+    "MEDIA_MAX_REQUEST_SIZE",
+    "MEDIA_IO_WORKERS",
+    "MEDIA_VARIANTS",
+    "MEDIA_VARIANT_FORMAT",
+    "MEDIA_CACHE_MAXSIZE",
+    "MEDIA_CACHE_TTL",
+    "MEDIA_CACHE_BODY_SIZE",
+    "MEDIA_CACHE_MAX_BYTES",
+    "NEWS_COMMENTS_PREVIEW_LIMIT",
+    "NEWS_COMMENT_COUNT_DELAY",
+    "COMMENT_PARTITIONS_AHEAD",
+    "COMMENT_PARTITIONS_RETENTION",
     "REDIS_URL",
     "BASE_URL",
+    "CACHE_LOCAL_MAXSIZE",
+    "CACHE_LOCAL_TTL",
+    "CACHE_STALE_TTL",
+    "CACHE_LOCK_TIMEOUT",
+    "CACHE_COUNT_TTL",
+    "CACHE_TAG_TTL",
     "SMTP_HOST",
     "SMTP_PORT",
     "SMTP_USER",
@@ -0,0 +1,52 @@
+"""
+Sparse fieldsets helpers
+"""
+
+import functools
+from typing import Sequence
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+from .pagination import Page
+
+
+def parse_fields(fields: str | None, schema: type[BaseModel]) -> tuple[str, ...] | None:
+    """
+    Parses comma separated fields query parameter against schema fields \n
+    Result is ordered as in schema and always contains id \n
+    """
+    if not fields:
+        return None
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - schema.model_fields.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    return tuple(name for name in schema.model_fields if name in requested or name == "id")
+
+
+@functools.lru_cache(maxsize=256)
+def sparse_schema(schema: type[BaseModel], fields: tuple[str, ...]) -> type[BaseModel]:
+    """
+    Builds reduced copy of schema containing only the given fields
+    """
+    return create_model(
+        f"{schema.__name__}Sparse",
+        __config__=ConfigDict(from_attributes=True),
+        **{
+            name: (info.annotation, info)
+            for name, info in schema.model_fields.items()
+            if name in fields
+        },
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def sparse_list_adapter(schema: type[BaseModel], fields: tuple[str, ...]) -> TypeAdapter:
+    """
+    Adapter for list endpoints returning reduced schema items either as list or page
+    """
+    model = sparse_schema(schema, fields)
+    return TypeAdapter(Sequence[model] | Page[model])
@@ -2,56 +2,360 @@
 DB models Manager
 """
 
+import json
+import hashlib
+import operator
+import functools
+from datetime import datetime
 from typing import Sequence, Type, Any
 
-from sqlalchemy import select, delete
+from fastapi import HTTPException
+from sqlalchemy import Delete, Integer, Select, Update, bindparam, select, insert, update, delete, tuple_, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, load_only
 
 from .database import Base
+from .environs import CACHE_COUNT_TTL
+from .pagination import Page, encode_cursor, decode_cursor
+from .redis import redis_client
+
+COUNT_PREFIX = "count:"
+
+# Statements below are built once per shape with bound parameters, so SQLAlchemy
+# reuses their memoized cache key instead of rebuilding and rehashing them per call
+STATEMENT_CACHE_SIZE = 512
+
+FILTER_OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": lambda column, value: column.in_(value),
+}
 
 class DBManager():
 
+    @staticmethod
+    def get_ordering(model: Type[Base], order_by: str) -> tuple[list[Any], bool]:
+        """
+        Returns ordering columns (always ending with id) and descending flag
+        for "field" / "-field" ordering
+        """
+        descending = order_by.startswith("-")
+        field = order_by.lstrip("-")
+        columns = [getattr(model, field)]
+        if field != "id":
+            columns.append(model.id)
+        return columns, descending
+
+
+    @staticmethod
+    def check_filters(
+        filters: dict[str, Any],
+        allowed: dict[str, Sequence[str]],
+    ) -> dict[str, Any]:
+        """
+        Drops empty filters and checks the rest against a whitelist of
+        operators per field, e.g. {"created": ("gt", "lt")} \n
+        Aware datetimes are converted to naive local time, as timestamps are stored \n
+        """
+        checked = {}
+        for key, value in filters.items():
+            if value is None:
+                continue
+            field, _, operation = key.partition("__")
+            if (operation or "eq") not in allowed.get(field, ()):
+                raise HTTPException(status_code=400, detail=f"Filtering by {key} is not allowed")
+            if isinstance(value, datetime) and value.tzinfo is not None:
+                value = value.astimezone().replace(tzinfo=None)
+            checked[key] = value
+        return checked
+
+
+    @staticmethod
+    def get_filters(model: Type[Base], filters: dict[str, Any] | None) -> list[Any]:
+        """
+        Compiles filters into WHERE predicates \n
+        Keys are "field" or "field__operator", operators are listed in FILTER_OPERATORS \n
+        """
+        predicates = []
+        for key, value in (filters or {}).items():
+            field, _, operation = key.partition("__")
+            predicates.append(FILTER_OPERATORS[operation or "eq"](getattr(model, field), value))
+        return predicates
+
+
     @staticmethod
     async def get_objects(
         db: AsyncSession,
         model: Type[Base],
         filters: dict[str, Any] | None = None,
         offset: int = 0,
-        limit: int = 10
+        limit: int = 10,
+        order_by: str = "id",
+        after: list[Any] | None = None,
+        backwards: bool = False,
+        options: Any = None,
+        columns: Sequence[str] | None = None,
     ) -> Sequence[Base]:
         """
-        Возвращает список объектов с фильтрацией
+        Возвращает список объектов с фильтрацией \n
+        Rows are ordered by order_by and id, after makes it a keyset query
+        starting behind the given ordering values \n
+        columns restricts loaded columns (plus ordering ones), others raise on access \n
         """
-        query = select(model)
+        filters = filters or {}
+        query = DBManager.select_objects(
+            model,
+            filters=tuple(filters),
+            order_by=order_by,
+            keyset=after is not None,
+            backwards=backwards,
+            offset=bool(offset),
+            columns=tuple(columns) if columns else None,
+        )
+        if options:
+            query = query.options(*options)
 
-        if filters:
-            for field, value in filters.items():
-                query = query.where(getattr(model, field) == value)
+        params = {f"filter_{key}": value for key, value in filters.items()}
+        params.update({f"after_{index}": value for index, value in enumerate(after or [])})
+        params["limit"] = limit
+        if offset:
+            params["offset"] = offset
 
-        query = query.offset(offset).limit(limit)
-        result = await db.execute(query)
+        result = await db.execute(query, params)
         return result.scalars().all()
 
 
+    @staticmethod
+    @functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+    def select_objects(
+        model: Type[Base],
+        filters: tuple[str, ...] = (),
+        order_by: str = "id",
+        keyset: bool = False,
+        backwards: bool = False,
+        offset: bool = False,
+        columns: tuple[str, ...] | None = None,
+    ) -> Select:
+        """
+        Cached list statement for get_objects \n
+        Binds filter_<key> per filter, after_<n> per ordering column for keyset
+        queries, limit and offset \n
+        """
+        query = select(model).where(*DBManager.get_filters(model, {
+            key: bindparam(f"filter_{key}", expanding=key.endswith("__in")) for key in filters
+        }))
+
+        ordering, descending = DBManager.get_ordering(model, order_by)
+        if backwards:
+            descending = not descending
+
+        if keyset:
+            key = tuple_(*ordering)
+            values = tuple_(*[
+                bindparam(f"after_{index}", type_=column.type) for index, column in enumerate(ordering)
+            ])
+            query = query.where(key < values if descending else key > values)
+
+        query = query.order_by(*[column.desc() if descending else column.asc() for column in ordering])
+
+        if columns:
+            loaded = [getattr(model, column) for column in columns]
+            loaded += [column for column in ordering if column.key not in columns]
+            query = query.options(load_only(*loaded, raiseload=True))
+
+        if offset:
+            query = query.offset(bindparam("offset", type_=Integer()))
+
+        return query.limit(bindparam("limit", type_=Integer()))
+
+
+    @staticmethod
+    async def get_page(
+        db: AsyncSession,
+        model: Type[Base],
+        filters: dict[str, Any] | None = None,
+        cursor: str | None = None,
+        limit: int = 10,
+        order_by: str = "-created",
+        options: Any = None,
+        columns: Sequence[str] | None = None,
+        estimate: bool = False,
+    ) -> Page:
+        """
+        Returns keyset paginated page with opaque next/prev cursors \n
+        Cost of any page equals the cost of the first one \n
+        estimate adds total_estimate from estimate_count \n
+        """
+        ordering, _ = DBManager.get_ordering(model, order_by)
+        after, backwards = None, False
+        if cursor:
+            types = [column.type.python_type for column in ordering]
+            after, backwards = decode_cursor(cursor, order_by, types)
+
+        items = list(await DBManager.get_objects(
+            db,
+            model=model,
+            filters=filters,
+            limit=limit + 1,
+            order_by=order_by,
+            after=after,
+            backwards=backwards,
+            options=options,
+            columns=columns,
+        ))
+        has_more = len(items) > limit
+        items = items[:limit]
+        if backwards:
+            items.reverse()
+
+        def key(instance: Base) -> list[Any]:
+            return [getattr(instance, column.key) for column in ordering]
+
+        page = Page(items=items)
+        if items and (has_more or backwards):
+            page.next_cursor = encode_cursor(order_by, key(items[-1]))
+        if items and cursor and (has_more or not backwards):
+            page.prev_cursor = encode_cursor(order_by, key(items[0]), backwards=True)
+        page.has_more = page.next_cursor is not None
+        if estimate:
+            page.total_estimate = await DBManager.estimate_count(db, model, filters)
+        return page
+
+
+    @staticmethod
+    async def get_envelope(
+        db: AsyncSession,
+        model: Type[Base],
+        filters: dict[str, Any] | None = None,
+        offset: int = 0,
+        limit: int = 10,
+        order_by: str = "id",
+        options: Any = None,
+        columns: Sequence[str] | None = None,
+    ) -> Page:
+        """
+        Returns offset page wrapped with has_more and total_estimate \n
+        has_more comes from fetching one extra row, so no COUNT(*) is needed \n
+        """
+        items = list(await DBManager.get_objects(
+            db,
+            model=model,
+            filters=filters,
+            offset=offset,
+            limit=limit + 1,
+            order_by=order_by,
+            options=options,
+            columns=columns,
+        ))
+        return Page(
+            items=items[:limit],
+            has_more=len(items) > limit,
+            total_estimate=await DBManager.estimate_count(db, model, filters),
+        )
+
+
+    @staticmethod
+    async def estimate_count(
+        db: AsyncSession,
+        model: Type[Base],
+        filters: dict[str, Any] | None = None,
+    ) -> int:
+        """
+        Returns approximate number of rows \n
+        Whole tables are estimated from planner statistics (pg_class.reltuples,
+        summed over partitions of partitioned tables),
+        filtered counts are computed once and cached for CACHE_COUNT_TTL seconds \n
+        """
+        table = model.__tablename__
+        if not filters:
+            # reltuples is -1 for partitioned tables and until a table is analyzed for the first time
+            estimate = await db.scalar(
+                text(
+                    "SELECT sum(reltuples)::bigint FROM pg_class "
+                    "WHERE reltuples >= 0 AND (oid = to_regclass(:table) "
+                    "OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(:table)))"
+                ),
+                {"table": table},
+            )
+            if estimate is not None:
+                return estimate
+
+        digest = hashlib.sha1(json.dumps(filters or {}, sort_keys=True, default=str).encode()).hexdigest()
+        key = f"{COUNT_PREFIX}{table}:{digest}"
+        cached = await redis_client.get(key)
+        if cached is not None:
+            return int(cached)
+
+        count = await db.scalar(
+            select(func.count()).select_from(model).where(*DBManager.get_filters(model, filters))
+        )
+        await redis_client.setex(key, CACHE_COUNT_TTL, count)
+        return count
+
+
+    @staticmethod
+    def get_lookup(model: Type[Base], field: str, owner_field: str | None = None) -> list[Any]:
+        """
+        Predicates matching a row by field, bound as value, and optionally
+        by owner_field, bound as owner (e.g. ownership checks)
+        """
+        predicates = [getattr(model, field) == bindparam("value")]
+        if owner_field is not None:
+            predicates.append(getattr(model, owner_field) == bindparam("owner"))
+        return predicates
+
+
+    @staticmethod
+    def get_lookup_params(value: Any, owner_field: str | None = None, owner: Any = None) -> dict[str, Any]:
+        """
+        Bound parameters of get_lookup predicates
+        """
+        if owner_field is None:
+            return {"value": value}
+        return {"value": value, "owner": owner}
+
+
     @staticmethod
     async def get_object(
         db: AsyncSession,
         model: Type[Base],
         field: str,
         value: Any,
-        options: Any = None,
+        joined: Sequence[str] = (),
+        owner_field: str | None = None,
+        owner: Any = None,
     ) -> Base | None:
         """
-        Возвращает объект по указанному полю (не обязательно id)
+        Возвращает объект по указанному полю (не обязательно id) \n
+        joined relationships are loaded in the same query,
+        owner_field restricts the row to the owner \n
         """
-        query = select(model).where(getattr(model, field) == value)
-        if options:
-            query = query.options(*options)
-
-        result = await db.execute(query)
+        query = DBManager.select_by(model, field, tuple(joined), owner_field)
+        result = await db.execute(query, DBManager.get_lookup_params(value, owner_field, owner))
         return result.unique().scalar_one_or_none()
 
 
+    @staticmethod
+    @functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+    def select_by(
+        model: Type[Base],
+        field: str,
+        joined: tuple[str, ...] = (),
+        owner_field: str | None = None,
+    ) -> Select:
+        """
+        Cached SELECT of model by field with joined relationships, binds value and owner
+        """
+        query = select(model).where(*DBManager.get_lookup(model, field, owner_field))
+        if joined:
+            query = query.options(*[joinedload(getattr(model, relationship)) for relationship in joined])
+        return query
+
+
     @staticmethod
     async def create_object(
         db: AsyncSession,
@@ -79,15 +383,36 @@ class DBManager():
         field: str,
         value: Any,
         commit: bool = False,
-    ) -> None:
+        owner_field: str | None = None,
+        owner: Any = None,
+    ) -> Base | None:
         """
-        Method deletes a model instance
+        Method deletes a model instance with DELETE ... RETURNING \n
+        owner_field restricts the row to the owner \n
+        Returns deleted instance or None if nothing matched \n
         """
-        query = delete(model).where(getattr(model, field)==value)
-        await db.execute(query)
+        query = DBManager.delete_by(model, field, owner_field)
+        result = await db.execute(query, DBManager.get_lookup_params(value, owner_field, owner))
+        instance = result.scalar_one_or_none()
 
         if commit:
-            await db.commit()
+            await DBManager.commit_detached(db, [instance] if instance is not None else [])
+
+        return instance
+
+
+    @staticmethod
+    @functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+    def delete_by(model: Type[Base], field: str, owner_field: str | None = None) -> Delete:
+        """
+        Cached DELETE ... RETURNING of model by field, binds value and owner
+        """
+        return (
+            delete(model)
+            .where(*DBManager.get_lookup(model, field, owner_field))
+            .returning(model)
+            .execution_options(synchronize_session=False)
+        )
 
 
     @staticmethod
@@ -97,28 +422,50 @@ class DBManager():
         field: str,
         value: Any,
         commit: bool = False,
+        owner_field: str | None = None,
+        owner: Any = None,
         **kwargs
     ) -> Base | None:
         """
-        Method updates a model instance
+        Method updates a model instance with a single UPDATE ... RETURNING \n
+        owner_field restricts the row to the owner \n
+        Returns None if nothing matched \n
         """
-        query = select(model).where(getattr(model, field) == value)
-        result = await db.execute(query)
+        if not kwargs:
+            return await DBManager.get_object(
+                db=db, model=model, field=field, value=value, owner_field=owner_field, owner=owner
+            )
+
+        query = DBManager.update_by(model, field, tuple(sorted(kwargs)), owner_field)
+        params = {f"set_{key}": item for key, item in kwargs.items()}
+        result = await db.execute(query, {**DBManager.get_lookup_params(value, owner_field, owner), **params})
         instance = result.scalar_one_or_none()
 
         if instance is None:
             return None
 
-        for field, value in kwargs.items():
-            setattr(instance, field, value)
-
         if commit:
-            await db.commit()
-            await db.refresh(instance)
+            await DBManager.commit_detached(db, [instance])
 
         return instance
 
 
+    @staticmethod
+    @functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+    def update_by(model: Type[Base], field: str, keys: tuple[str, ...], owner_field: str | None = None) -> Update:
+        """
+        Cached UPDATE ... RETURNING of model by field, binds value, owner
+        and set_<key> per updated column
+        """
+        return (
+            update(model)
+            .where(*DBManager.get_lookup(model, field, owner_field))
+            .values({key: bindparam(f"set_{key}") for key in keys})
+            .returning(model)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+
+
     @staticmethod
     async def partial_update_object(
         db: AsyncSession,
@@ -126,24 +473,131 @@ class DBManager():
         field: str,
         value: Any,
         commit: bool = False,
+        owner_field: str | None = None,
+        owner: Any = None,
         **kwargs
     ) -> Base | None:
         """
-        Method partially updates a model instance
+        Method partially updates a model instance, empty values are skipped
         """
-        query = select(model).where(getattr(model, field) == value)
-        result = await db.execute(query)
-        instance = result.scalar_one_or_none()
+        values = {
+            key: item for key, item in kwargs.items()
+            if key in model.__table__.columns and item
+        }
+        return await DBManager.update_object(
+            db=db, model=model, field=field, value=value, commit=commit, owner_field=owner_field, owner=owner, **values
+        )
 
-        if instance is None:
-            return None
 
-        for field, value in kwargs.items():
-            if field in model.__table__.columns and value:
-                setattr(instance, field, value)
+    @staticmethod
+    async def get_existing(
+        db: AsyncSession,
+        model: Type[Base],
+        field: str,
+        values: Sequence[Any],
+    ) -> set[Any]:
+        """
+        Returns those of values which exist in the field column
+        """
+        if not values:
+            return set()
+
+        result = await db.scalars(DBManager.select_existing(model, field), {"values": list(set(values))})
+        return set(result.all())
+
+
+    @staticmethod
+    @functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+    def select_existing(model: Type[Base], field: str) -> Select:
+        """
+        Cached SELECT of field values present among bound values
+        """
+        column = getattr(model, field)
+        return select(column).where(column.in_(bindparam("values", expanding=True)))
+
+
+    @staticmethod
+    async def bulk_create(
+        db: AsyncSession,
+        model: Type[Base],
+        rows: Sequence[dict[str, Any]],
+        commit: bool = False,
+    ) -> Sequence[Base]:
+        """
+        Creates objects with a single multi-row INSERT ... RETURNING
+        """
+        if not rows:
+            return []
+
+        result = await db.scalars(insert(model).returning(model, sort_by_parameter_order=True), list(rows))
+        instances = result.all()
+
+        if commit:
+            await DBManager.commit_detached(db, instances)
+
+        return instances
+
+
+    @staticmethod
+    async def bulk_update(
+        db: AsyncSession,
+        model: Type[Base],
+        rows: Sequence[dict[str, Any]],
+        commit: bool = False,
+    ) -> Sequence[Base]:
+        """
+        Updates objects by primary key with one executemany UPDATE \n
+        Rows must contain id, rows of missing objects are skipped \n
+        """
+        existing = await DBManager.get_existing(db, model, "id", [row["id"] for row in rows])
+        rows = [row for row in rows if row["id"] in existing]
+        if not rows:
+            return []
+
+        await db.execute(update(model), rows)
+        result = await db.scalars(
+            select(model)
+            .where(model.id.in_(existing))
+            .execution_options(populate_existing=True)
+        )
+        instances = result.all()
+
+        if commit:
+            await DBManager.commit_detached(db, instances)
+
+        return instances
+
+
+    @staticmethod
+    async def bulk_delete(
+        db: AsyncSession,
+        model: Type[Base],
+        field: str,
+        values: Sequence[Any],
+        commit: bool = False,
+    ) -> set[Any]:
+        """
+        Deletes objects with a single DELETE ... RETURNING, returns deleted values
+        """
+        if not values:
+            return set()
+
+        column = getattr(model, field)
+        result = await db.scalars(delete(model).where(column.in_(set(values))).returning(column))
+        deleted = set(result.all())
 
         if commit:
             await db.commit()
-            await db.refresh(instance)
 
-        return instance
+        return deleted
+
+
+    @staticmethod
+    async def commit_detached(db: AsyncSession, instances: Sequence[Base]) -> None:
+        """
+        Commits session keeping loaded state of instances, so they can be
+        serialized without a refresh query per object
+        """
+        for instance in instances:
+            db.expunge(instance)
+        await db.commit()
@@ -0,0 +1,95 @@
+"""
+In-memory cache of media file metadata and small file bodies
+"""
+
+import os
+import re
+import stat
+import mimetypes
+from email.utils import formatdate
+from typing import NamedTuple
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException
+
+from ..environs import MEDIA_CACHE_MAXSIZE, MEDIA_CACHE_TTL, MEDIA_CACHE_BODY_SIZE, MEDIA_CACHE_MAX_BYTES
+from ..redis import LocalCache
+
+# Originals stored by their SHA-256 (src.news.utils.media_path) and their
+# variants (<sha256>.<variant>.<format>, src.media.variants) never change
+CONTENT_ADDRESSED = re.compile(r"^(?P<name>[0-9a-f]{64}(\.[a-z0-9_-]+)??)(\.[a-z0-9]+)?$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+class MediaFile(NamedTuple):
+    """
+    Stat result, response headers and, for small files, body of a media file
+    """
+
+    stat_result: os.stat_result
+    media_type: str
+    headers: dict[str, str]
+    body: bytes | None
+
+
+media_cache = LocalCache(
+    maxsize=MEDIA_CACHE_MAXSIZE,
+    ttl=MEDIA_CACHE_TTL,
+    max_weight=MEDIA_CACHE_MAX_BYTES,
+    weigh=lambda media: len(media.body or b""),
+)
+
+
+def media_headers(path: str, stat_result: os.stat_result) -> dict[str, str]:
+    """
+    Validators and caching policy of media file \n
+    Content addressed files get their digest (and variant name) as ETag and are cached forever,
+    others are revalidated with ETag built from mtime and size \n
+    """
+    match = CONTENT_ADDRESSED.match(os.path.basename(path))
+    if match:
+        etag, cache_control = f'"{match["name"]}"', IMMUTABLE_CACHE_CONTROL
+    else:
+        etag, cache_control = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"', REVALIDATE_CACHE_CONTROL
+
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        # Bodies served from memory skip FileResponse, which would announce it
+        "Accept-Ranges": "bytes",
+    }
+
+
+async def get_media_file(path: str, with_body: bool = True) -> MediaFile:
+    """
+    Returns media file from cache, loading its stat result and small body on miss \n
+    with_body=False only stats the file, for files sent by somebody else (nginx) \n
+    """
+    media = media_cache.get(path)
+    if media is not None:
+        return media
+
+    try:
+        stat_result = await aiofiles.os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="File not found")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    body = None
+    if with_body and stat_result.st_size <= MEDIA_CACHE_BODY_SIZE:
+        async with aiofiles.open(path, mode="rb") as file:
+            body = await file.read()
+
+    media = MediaFile(
+        stat_result=stat_result,
+        media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+        headers=media_headers(path, stat_result),
+        body=body,
+    )
+    media_cache.set(path, media, MEDIA_CACHE_TTL)
+    return media
@@ -3,18 +3,59 @@ Media routers
 """
 
 import os
+from urllib.parse import quote
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from fastapi.responses import FileResponse
 
+from ..environs import MEDIA_ROOT, MEDIA_DELIVERY
+from ..responses import is_not_modified, not_modified_response
+from .cache import get_media_file
+
+MEDIA_ROOT_PATH = os.path.abspath(MEDIA_ROOT)
+
+# Internal nginx location aliased to MEDIA_ROOT, see docker/nginx/nginx.conf
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+
 router = APIRouter(
     prefix="/file",
     tags=["Media"]
 )
 
-@router.get("/{file_path:path}", response_class=FileResponse)
-async def get_media(file_path: str) -> FileResponse:
-    file = os.path.join(file_path)
-    if not os.path.isfile(file):
+
+def resolve_media_path(file_path: str) -> str:
+    """
+    Returns absolute path of media file, paths outside MEDIA_ROOT are not found
+    """
+    path = os.path.abspath(file_path)
+    if os.path.commonpath([MEDIA_ROOT_PATH, path]) != MEDIA_ROOT_PATH:
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(path=file)
+    return path
+
+
+@router.get("/{file_path:path}", response_class=FileResponse)
+async def get_media(file_path: str, request: Request) -> Response:
+    """
+    Get media file \n
+    With MEDIA_DELIVERY=nginx only checks the file and lets nginx send it
+    through X-Accel-Redirect, otherwise sends it from the app \n
+    Small files are served from memory, Range requests are answered with 206
+    and matching If-None-Match / If-Modified-Since with 304 \n
+    """
+    path = resolve_media_path(file_path)
+    media = await get_media_file(path, with_body=MEDIA_DELIVERY != "nginx")
+
+    if MEDIA_DELIVERY == "nginx":
+        location = MEDIA_ACCEL_PREFIX + quote(os.path.relpath(path, MEDIA_ROOT_PATH))
+        return Response(headers={"X-Accel-Redirect": location, "Cache-Control": media.headers["Cache-Control"]})
+
+    if media.body is not None and "range" not in request.headers:
+        response = Response(content=media.body, media_type=media.media_type, headers=media.headers)
+    else:
+        response = FileResponse(
+            path=path, media_type=media.media_type, headers=media.headers, stat_result=media.stat_result
+        )
+
+    if is_not_modified(request, response):
+        return not_modified_response(response)
+    return response
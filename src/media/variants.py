@@ -0,0 +1,78 @@
+"""
+Resized image variants of stored media
+"""
+
+import os
+import tempfile
+
+from ..environs import MEDIA_VARIANTS, MEDIA_VARIANT_FORMAT
+
+
+def get_umask() -> int:
+    """
+    Returns process umask, os.umask can only read it by replacing it
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Temporary files are created with 0600, stored media has to be readable
+# by nginx workers running as another user (MEDIA_DELIVERY=nginx)
+MEDIA_FILE_MODE = 0o644 & ~get_umask()
+
+
+def variant_path(path: str, name: str) -> str:
+    """
+    Deterministic path of a variant: <hash>.png -> <hash>.<name>.<format>
+    """
+    return f"{os.path.splitext(path)[0]}.{name}.{MEDIA_VARIANT_FORMAT}"
+
+
+def get_variants(path: str) -> dict[str, str]:
+    """
+    Paths of every configured variant of media file
+    """
+    return {name: variant_path(path, name) for name in MEDIA_VARIANTS}
+
+
+def generate_variants(path: str) -> list[str]:
+    """
+    Creates missing variants of image downscaled to configured widths,
+    returns created paths \n
+    Files which are not images are skipped \n
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    missing = {name: target for name, target in get_variants(path).items() if not os.path.exists(target)}
+    if not missing:
+        return []
+
+    try:
+        with Image.open(path) as original:
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError):
+        return []
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    created = []
+    for name, target in missing.items():
+        width = MEDIA_VARIANTS[name]
+        variant = image.copy()
+        variant.thumbnail((width, width * image.height // image.width or 1), Image.Resampling.LANCZOS)
+
+        # Written aside and renamed, so a half written variant is never served
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".variant-")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                variant.save(file, format=MEDIA_VARIANT_FORMAT, quality=80)
+            os.chmod(temp_path, MEDIA_FILE_MODE)
+            os.replace(temp_path, target)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        created.append(target)
+    return created
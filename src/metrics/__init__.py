@@ -0,0 +1,9 @@
+"""
+__init__.py
+"""
+
+from .routers import router as metrics_router
+
+__all__ = [
+    "metrics_router"
+]
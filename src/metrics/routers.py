@@ -0,0 +1,27 @@
+"""
+Metrics routers
+"""
+
+from fastapi import APIRouter, Depends
+
+from src.database import get_pool_stats
+from src.users import fastapi_users, User
+
+from .schemas import PoolStatsSchema
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+admin_user = fastapi_users.current_user(active=True, superuser=True)
+
+
+@router.get("/db-pool", response_model=dict[str, PoolStatsSchema])
+async def get_db_pool_stats(user: User = Depends(admin_user)) -> dict:
+    """
+    Get connection pool occupancy and checkout wait statistics \n
+    Authentication required \n
+    Authenticated user must be superuser \n
+    """
+    return get_pool_stats()
@@ -0,0 +1,22 @@
+"""
+Metrics schemas
+"""
+
+from pydantic import BaseModel
+
+
+class PoolStatsSchema(BaseModel):
+    """
+    Connection pool statistics schema
+    """
+
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    max_overflow_used: int
+    checkouts: int
+    timeouts: int
+    avg_wait_time: float
+    max_wait_time: float
@@ -6,11 +6,14 @@ SQLalchemy ORM models
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import ForeignKey, String, ARRAY
+from sqlalchemy import ForeignKey, Index, String, ARRAY, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.database import Base
 
+SEARCH_CONFIG = "english"
+
 
 class Category(Base):
     """
@@ -20,7 +23,8 @@ class Category(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(length=100), nullable=False)
-    created: Mapped[datetime] = mapped_column(default=datetime.now())
+    created: Mapped[datetime] = mapped_column(default=datetime.now)
+    news_count: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
 
     news: Mapped[list["News"]] = relationship("News", back_populates="category")
 
@@ -29,13 +33,29 @@ class News(Base):
     News model
     """
     __tablename__ = "news"
+    __table_args__ = (
+        Index("ix_news_created", "created", "id"),
+        Index("ix_news_updated", "updated", "id"),
+        Index("ix_news_category_created", "category_id", "created", "id"),
+        Index("ix_news_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     title: Mapped[str] = mapped_column(String(length=100), nullable=False)
     content: Mapped[str | None] = mapped_column(nullable=True)
     images: Mapped[list[str | None]] = mapped_column(ARRAY(String), nullable=True)
-    created: Mapped[datetime] = mapped_column(default=datetime.now())
-    updated: Mapped[datetime] = mapped_column(default=datetime.now())
+    created: Mapped[datetime] = mapped_column(default=datetime.now)
+    updated: Mapped[datetime] = mapped_column(default=datetime.now, onupdate=datetime.now)
+    comment_count: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     category_id: Mapped[int | None] = mapped_column(
         ForeignKey("category.id", ondelete="SET NULL"), nullable=True
@@ -50,11 +70,19 @@ class Comment(Base):
     Comment model
     """
     __tablename__ = "comment"
+    __table_args__ = (
+        Index("ix_comment_news_id", "news_id", "created", "id"),
+        Index("ix_comment_created", "created", "id"),
+        Index("ix_comment_user_created", "user_id", "created", "id"),
+        # Monthly partitions are managed by src.news.partitions,
+        # primary key has to include the partition key
+        {"postgresql_partition_by": "RANGE (created)"},
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     content: Mapped[str] = mapped_column(String(2500), nullable=False)
-    created: Mapped[datetime] = mapped_column(default=datetime.now())
-    updated: Mapped[datetime] = mapped_column(default=datetime.now())
+    created: Mapped[datetime] = mapped_column(primary_key=True, default=datetime.now)
+    updated: Mapped[datetime] = mapped_column(default=datetime.now, onupdate=datetime.now)
 
     news_id: Mapped[int] = mapped_column(ForeignKey("news.id", ondelete="CASCADE"), nullable=False)
     user_id: Mapped[UUID] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
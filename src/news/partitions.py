@@ -0,0 +1,145 @@
+"""
+Monthly range partitions of the comment table
+"""
+
+import logging
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.redis import invalidate_tags
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLE = "comment"
+
+# Catches comments outside of every monthly partition, see create_partitions
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+
+
+def add_months(value: date, months: int) -> date:
+    """
+    Returns first day of the month of value shifted by months
+    """
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """
+    Name of the partition holding comments created in the month
+    """
+    return f"{PARTITIONED_TABLE}_p{month:%Y_%m}"
+
+
+async def get_partitions(connection: AsyncConnection) -> list[str]:
+    """
+    Returns names of attached monthly partitions
+    """
+    result = await connection.execute(
+        text(
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent = to_regclass(:table) AND inhrelid IS DISTINCT FROM to_regclass(:default) ORDER BY 1"
+        ),
+        {"table": PARTITIONED_TABLE, "default": DEFAULT_PARTITION},
+    )
+    return list(result.scalars())
+
+
+async def recount_comments(connection: AsyncConnection, source: str) -> list[int]:
+    """
+    Recomputes comment_count of news having comments in source table,
+    returns their ids \n
+    Needed after rows are moved between partitions or detached, as that fires
+    no triggers of the partitioned table or fires them only on one side \n
+    """
+    result = await connection.execute(text(
+        f"UPDATE news SET comment_count = ("
+        f"SELECT count(*) FROM {PARTITIONED_TABLE} WHERE {PARTITIONED_TABLE}.news_id = news.id"
+        f") WHERE id IN (SELECT DISTINCT news_id FROM {source}) RETURNING id"
+    ))
+    return list(result.scalars())
+
+
+async def create_partitions(connection: AsyncConnection, months_ahead: int, since: date | None = None) -> list[str]:
+    """
+    Creates missing partitions from since (current month by default)
+    up to months_ahead months in the future, returns created ones \n
+    Comments of the month already caught by the default partition are moved
+    into the new partition, so connection must be in a transaction \n
+    """
+    month = add_months(since or date.today(), 0)
+    last = add_months(date.today(), months_ahead)
+    existing = set(await get_partitions(connection))
+    has_default = await connection.scalar(
+        text("SELECT to_regclass(:default) IS NOT NULL"), {"default": DEFAULT_PARTITION}
+    )
+
+    created = []
+    while month <= last:
+        name = partition_name(month)
+        if name not in existing:
+            bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            in_month = f"created >= '{month.isoformat()}' AND created < '{add_months(month, 1).isoformat()}'"
+            caught = has_default and await connection.scalar(
+                text(f"SELECT EXISTS (SELECT FROM {DEFAULT_PARTITION} WHERE {in_month})")
+            )
+            if caught:
+                # A range partition can not be created while the default one holds its rows
+                await connection.execute(text(f"CREATE TABLE {name} (LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS)"))
+                moved = await connection.execute(text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_month} RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ))
+                await connection.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+                await recount_comments(connection, name)
+                logger.warning("Moved %s comments from %s to %s, partitions ran out", moved.rowcount, DEFAULT_PARTITION, name)
+            else:
+                await connection.execute(text(f"CREATE TABLE {name} PARTITION OF {PARTITIONED_TABLE} FOR VALUES {bounds}"))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+async def get_expired_partitions(connection: AsyncConnection, retention_months: int) -> list[str]:
+    """
+    Returns attached partitions older than retention_months
+    """
+    oldest = partition_name(add_months(date.today(), -retention_months))
+    return [name for name in await get_partitions(connection) if name < oldest]
+
+
+async def detach_partition(connection: AsyncConnection, name: str) -> list[int]:
+    """
+    Detaches partition and recomputes counters of news having comments in it,
+    returns their ids \n
+    DETACH CONCURRENTLY is not allowed while a default partition exists, so
+    the partitioned table is locked until the caller's transaction ends \n
+    """
+    await connection.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {name}"))
+    # Detaching fires no delete triggers
+    return await recount_comments(connection, name)
+
+
+async def detach_partitions(connection: AsyncConnection, retention_months: int) -> list[str]:
+    """
+    Detaches partitions older than retention_months, returns detached ones \n
+    Detached tables stay in the database as an archive and can be dumped and dropped \n
+    Connection must not be in a transaction, every partition is detached in
+    its own short one \n
+    Cached comments and counters of affected news are invalidated once it commits \n
+    """
+    detached = await get_expired_partitions(connection, retention_months)
+    await connection.commit()
+
+    for name in detached:
+        async with connection.begin():
+            news_ids = await detach_partition(connection, name)
+        await invalidate_tags(
+            "news:list",
+            "comment:list",
+            *[f"news:{news_id}" for news_id in news_ids],
+            *[f"news:{news_id}:comments" for news_id in news_ids],
+        )
+    return detached
@@ -9,11 +9,14 @@ from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import Category
-from ..schemas import CategoryReadSchema, CategoryCreateSchema
+from ..schemas import CategoryReadSchema, CategoryCreateSchema, CategoryBatchSchema, BatchResultSchema
 from ..services import CategoryService
 
-from src.database import get_db
+from src.database import get_db, get_read_db
+from src.fieldsets import parse_fields, sparse_list_adapter
+from src.pagination import Page, Pagination
 from src.redis import cache
+from src.responses import render_response
 from src.users import fastapi_users, User
 
 router = APIRouter(
@@ -23,19 +26,36 @@ router = APIRouter(
 
 admin_user = fastapi_users.current_user(active=True, superuser=True)
 
-@router.get("", response_model=Sequence[CategoryReadSchema])
-@cache(60 * 5)
-async def get_categories(offset: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)) -> Sequence[Category]:
+@router.get("", response_model=Sequence[CategoryReadSchema] | Page[CategoryReadSchema])
+@cache(60 * 60, response_model=Sequence[CategoryReadSchema] | Page[CategoryReadSchema], tags=("category:list", "category:counts"))
+async def get_categories(
+    offset:     int = 0,
+    limit:      int = 10,
+    cursor:     str | None = None,
+    pagination: Pagination = "offset",
+    fields:     str | None = None,
+    envelope:   bool = False,
+    db:         AsyncSession = Depends(get_read_db),
+) -> Sequence[Category] | Page:
     """
     Get all categories \n
     No authentication required \n
+    pagination=cursor (or a cursor) switches to keyset pagination with next/prev cursors \n
+    fields=id,title,... loads and returns only the listed fields \n
+    envelope=true wraps results into {items, has_more, total_estimate} \n
     """
-    return await CategoryService.get_categories(db, offset, limit)
+    columns = parse_fields(fields, CategoryReadSchema)
+    categories = await CategoryService.get_categories(
+        db, offset, limit, cursor=cursor, pagination=pagination, columns=columns, envelope=envelope
+    )
+    if columns:
+        return render_response(sparse_list_adapter(CategoryReadSchema, columns), categories)
+    return categories
 
 
 @router.get("/{category_id}", response_model=CategoryReadSchema)
-@cache(60 * 5)
-async def get_category(category_id: int, db: AsyncSession = Depends(get_db)) -> Category:
+@cache(60 * 60, response_model=CategoryReadSchema, tags=("category:{category_id}", "category:counts"))
+async def get_category(category_id: int, db: AsyncSession = Depends(get_read_db)) -> Category:
     """
     Get category by id \n
     No authentication required \n
@@ -57,6 +77,21 @@ async def create_category(
     return await CategoryService.create_category(db, category.dict())
 
 
+@router.post("/batch", response_model=BatchResultSchema[CategoryReadSchema])
+async def batch_categories(
+    batch:  CategoryBatchSchema,
+    db:     AsyncSession = Depends(get_db),
+    user:   User = Depends(admin_user),
+) -> dict:
+    """
+    Creates, updates and deletes categories in a single transaction \n
+    Returns result of every item \n
+    Authentication required \n
+    Authenticated user must be superuser \n
+    """
+    return await CategoryService.batch_categories(db, batch)
+
+
 @router.delete("/{category_id}", status_code=204)
 async def delete_category(
     category_id:    int, 
@@ -2,7 +2,9 @@
 Comments Router
 """
 
+from datetime import datetime
 from typing import Sequence
+from uuid import UUID
 
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,8 +13,11 @@ from ..models import Comment
 from ..schemas import CommentReadSchema, CommentCreateSchema, CommentUpdateSchema
 from ..services import CommentService
 
-from src.database import get_db
+from src.database import get_db, get_read_db
+from src.fieldsets import parse_fields, sparse_list_adapter
+from src.pagination import Page, Pagination
 from src.redis import cache
+from src.responses import render_response
 from src.users import fastapi_users, User
 
 router = APIRouter(
@@ -23,19 +28,53 @@ router = APIRouter(
 authenticated_user = fastapi_users.current_user(active=True)
 
 
-@router.get("", response_model=Sequence[CommentReadSchema])
-@cache(60 * 5)
-async def get_comments(offset: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)) -> Sequence[Comment]:
+@router.get("", response_model=Sequence[CommentReadSchema] | Page[CommentReadSchema])
+@cache(60 * 60, response_model=Sequence[CommentReadSchema] | Page[CommentReadSchema], tags=("comment:list",))
+async def get_comments(
+    offset:     int = 0,
+    limit:      int = 10,
+    cursor:     str | None = None,
+    pagination: Pagination = "offset",
+    fields:     str | None = None,
+    envelope:   bool = False,
+    news_id:    int | None = None,
+    user_id:    UUID | None = None,
+    created_after:  datetime | None = None,
+    created_before: datetime | None = None,
+    db:         AsyncSession = Depends(get_read_db),
+) -> Sequence[Comment] | Page:
     """
     Get all comments \n
     No authentication required \n
+    pagination=cursor (or a cursor) switches to keyset pagination with next/prev cursors \n
+    fields=id,title,... loads and returns only the listed fields \n
+    envelope=true wraps results into {items, has_more, total_estimate} \n
+    news_id, user_id, created_after and created_before filter comments \n
     """
-    return await CommentService.get_comments(db, offset, limit)
+    columns = parse_fields(fields, CommentReadSchema)
+    comments = await CommentService.get_comments(
+        db,
+        offset,
+        limit,
+        cursor=cursor,
+        pagination=pagination,
+        columns=columns,
+        envelope=envelope,
+        filters={
+            "news_id": news_id,
+            "user_id": user_id,
+            "created__gt": created_after,
+            "created__lt": created_before,
+        },
+    )
+    if columns:
+        return render_response(sparse_list_adapter(CommentReadSchema, columns), comments)
+    return comments
 
 
 @router.get("/{comment_id}", response_model=CommentReadSchema)
-@cache(60 * 5)
-async def get_comment(comment_id: int, db: AsyncSession = Depends(get_db)) -> Comment:
+@cache(60 * 60, response_model=CommentReadSchema, tags=("comment:{comment_id}", "news:{result.news_id}:comments"))
+async def get_comment(comment_id: int, db: AsyncSession = Depends(get_read_db)) -> Comment:
     """
     Get comment by id \n
     No authentication required \n
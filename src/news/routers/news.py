@@ -2,17 +2,21 @@
 News Router
 """
 
+from datetime import datetime
 from typing import Sequence, Annotated
 
-from fastapi import APIRouter, Depends, Form, File, UploadFile
+from fastapi import APIRouter, Depends, Form, File, Query, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database import get_db
+from src.database import get_db, get_read_db
+from src.fieldsets import parse_fields, sparse_list_adapter
+from src.pagination import Page, Pagination
 from src.redis import cache
+from src.responses import render_response
 from src.users import fastapi_users, User
 
-from ..services import NewsService
-from ..schemas import NewsReadSchema, NewsReadDetailsSchema
+from ..services import NewsService, CommentService
+from ..schemas import NewsOrdering, NewsReadSchema, NewsReadDetailsSchema, NewsSearchResultSchema, NewsBatchSchema, BatchResultSchema, CommentReadSchema
 from ..models import News
 
 router = APIRouter(
@@ -22,19 +26,69 @@ router = APIRouter(
 
 admin_user = fastapi_users.current_user(active=True, superuser=True)
 
-@router.get("", response_model=Sequence[NewsReadSchema])
-@cache(60 * 5)
-async def get_news(offset: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)) -> Sequence[News]:
+@router.get("", response_model=Sequence[NewsReadSchema] | Page[NewsReadSchema])
+@cache(60 * 60, response_model=Sequence[NewsReadSchema] | Page[NewsReadSchema], tags=("news:list", "news:counts"))
+async def get_news(
+    offset:         int = 0,
+    limit:          int = 10,
+    cursor:         str | None = None,
+    pagination:     Pagination = "offset",
+    fields:         str | None = None,
+    envelope:       bool = False,
+    category_id:    int | None = None,
+    created_after:  datetime | None = None,
+    created_before: datetime | None = None,
+    order_by:       NewsOrdering = "-created",
+    db:             AsyncSession = Depends(get_read_db),
+) -> Sequence[News] | Page:
     """
     Get all news \n
     No authentication required \n
+    pagination=cursor (or a cursor) switches to keyset pagination with next/prev cursors \n
+    fields=id,title,... loads and returns only the listed fields \n
+    envelope=true wraps results into {items, has_more, total_estimate} \n
+    category_id, created_after and created_before filter news,
+    order_by=created|updated|id sorts them, prefixed with "-" for descending \n
+    comment_count lags behind new comments by up to NEWS_COMMENT_COUNT_DELAY seconds \n
     """
-    return await NewsService.get_news(db=db, offset=offset, limit=limit)
+    columns = parse_fields(fields, NewsReadSchema)
+    news = await NewsService.get_news(
+        db=db,
+        offset=offset,
+        limit=limit,
+        cursor=cursor,
+        pagination=pagination,
+        columns=columns,
+        envelope=envelope,
+        filters={"category_id": category_id, "created__gt": created_after, "created__lt": created_before},
+        order_by=order_by,
+    )
+    if columns:
+        return render_response(sparse_list_adapter(NewsReadSchema, columns), news)
+    return news
+
+
+@router.get("/search", response_model=Page[NewsSearchResultSchema])
+@cache(60 * 60, response_model=Page[NewsSearchResultSchema], tags=("news:list", "news:counts"))
+async def search_news(
+    q:              Annotated[str, Query(min_length=1, max_length=200)],
+    category_id:    int | None = None,
+    cursor:         str | None = None,
+    limit:          int = 10,
+    db:             AsyncSession = Depends(get_read_db),
+) -> Page:
+    """
+    Full text search over news title and content, best matches first \n
+    q supports web search syntax: "quoted phrases", OR, -excluded words \n
+    Matches are highlighted with <mark> in snippet and title_snippet \n
+    No authentication required \n
+    """
+    return await NewsService.search_news(db=db, q=q, category_id=category_id, cursor=cursor, limit=limit)
 
 
 @router.get("/{news_id}", response_model=NewsReadDetailsSchema)
-@cache(60 * 5)
-async def get_news_object(news_id: int, db: AsyncSession = Depends(get_db)) -> News:
+@cache(60 * 60, response_model=NewsReadDetailsSchema, tags=("news:{news_id}", "category:list"))
+async def get_news_object(news_id: int, db: AsyncSession = Depends(get_read_db)) -> News:
     """
     Get news by id \n
     No authentication required \n
@@ -42,9 +96,24 @@ async def get_news_object(news_id: int, db: AsyncSession = Depends(get_db)) -> N
     return await NewsService.get_news_object(db=db, news_id=news_id)
 
 
+@router.get("/{news_id}/comments", response_model=Page[CommentReadSchema])
+@cache(60 * 60, response_model=Page[CommentReadSchema], tags=("news:{news_id}:comments",))
+async def get_news_comments(
+    news_id:    int,
+    cursor:     str | None = None,
+    limit:      int = 10,
+    db:         AsyncSession = Depends(get_read_db),
+) -> Page:
+    """
+    Get comments of news, newest first, with cursor pagination \n
+    No authentication required \n
+    """
+    return await CommentService.get_news_comments(db=db, news_id=news_id, cursor=cursor, limit=limit)
+
+
 @router.post("", response_model=NewsReadSchema)
 async def create_news_object(
-    title:          Annotated[str, Form()],
+    title:          Annotated[str, Form(max_length=100)],
     images:         Annotated[list[UploadFile], File()],
     category_id:    Annotated[int, Form()],
     content:        Annotated[str | None, Form()] = None,
@@ -67,10 +136,26 @@ async def create_news_object(
     )
 
 
+@router.post("/batch", response_model=BatchResultSchema[NewsReadSchema])
+async def batch_news(
+    batch:  NewsBatchSchema,
+    db:     AsyncSession = Depends(get_db),
+    user:   User = Depends(admin_user),
+) -> dict:
+    """
+    Creates, updates and deletes news in a single transaction \n
+    Images must be paths of already stored media \n
+    Returns result of every item \n
+    Authentication required \n
+    Authenticated user must be superuser \n
+    """
+    return await NewsService.batch_news(db=db, batch=batch)
+
+
 @router.put("/{news_id}", response_model=NewsReadSchema)
 async def update_news(
     news_id:        int,
-    title:          Annotated[str, Form()],
+    title:          Annotated[str, Form(max_length=100)],
     images:         Annotated[list[UploadFile], File()],
     category_id:    Annotated[int, Form()],
     content:        Annotated[str, Form()],
@@ -97,7 +182,7 @@ async def update_news(
 @router.patch("/{news_id}", response_model=NewsReadSchema)
 async def partial_update_news(
     news_id:        int,
-    title:          Annotated[str | None, Form()] = None,
+    title:          Annotated[str | None, Form(max_length=100)] = None,
     images:         Annotated[list[UploadFile], File()] = [],
     category_id:    Annotated[int | None, Form()] = None,
     content:        Annotated[str | None, Form()] = None,
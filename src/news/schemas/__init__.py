@@ -2,15 +2,26 @@
 __init__.py
 """
 
-from .categories import CategoryCreateSchema, CategoryReadSchema
-from .news import NewsReadSchema, NewsReadDetailsSchema
+from .batch import BatchItemResultSchema, BatchResultSchema
+from .categories import CategoryBriefSchema, CategoryCreateSchema, CategoryReadSchema, CategoryBatchSchema, CategoryBatchUpdateSchema
+from .news import NewsOrdering, NewsReadSchema, NewsReadDetailsSchema, NewsSearchResultSchema, NewsCreateSchema, NewsBatchSchema, NewsBatchUpdateSchema
 from .comments import CommentCreateSchema, CommentReadSchema, CommentUpdateSchema
 
 __all__ = [
+    "BatchItemResultSchema",
+    "BatchResultSchema",
+    "CategoryBriefSchema",
     "CategoryCreateSchema",
     "CategoryReadSchema",
+    "CategoryBatchSchema",
+    "CategoryBatchUpdateSchema",
+    "NewsOrdering",
     "NewsReadSchema",
     "NewsReadDetailsSchema",
+    "NewsSearchResultSchema",
+    "NewsCreateSchema",
+    "NewsBatchSchema",
+    "NewsBatchUpdateSchema",
     "CommentCreateSchema",
     "CommentReadSchema",
     "CommentUpdateSchema",
@@ -0,0 +1,36 @@
+"""
+Pydantic schemas for batch operations
+"""
+
+from typing import Generic, Literal, TypeVar
+
+from pydantic import BaseModel, ConfigDict
+
+T = TypeVar("T")
+
+BATCH_MAX_SIZE = 1000
+
+
+class BatchItemResultSchema(BaseModel, Generic[T]):
+    """
+    Result of a single batch item
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    action: Literal["create", "update", "delete"]
+    index: int
+    status: int
+    id: int | None = None
+    detail: str | None = None
+    item: T | None = None
+
+
+class BatchResultSchema(BaseModel, Generic[T]):
+    """
+    Per item results of a batch
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    results: list[BatchItemResultSchema[T]]
@@ -4,12 +4,14 @@ Pydantic schemas for Categories
 
 from datetime import datetime
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
+from .batch import BATCH_MAX_SIZE
 
-class CategoryReadSchema(BaseModel):
+
+class CategoryBriefSchema(BaseModel):
     """
-    Category read schema
+    Category schema embedded into other resources, without counters
     """
 
     model_config = ConfigDict(from_attributes=True)
@@ -19,6 +21,14 @@ class CategoryReadSchema(BaseModel):
     created: datetime
 
 
+class CategoryReadSchema(CategoryBriefSchema):
+    """
+    Category read schema
+    """
+
+    news_count: int = 0
+
+
 class CategoryCreateSchema(BaseModel):
     """
     Category create schema
@@ -26,4 +36,22 @@ class CategoryCreateSchema(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
-    name: str
+    name: str = Field(max_length=100)
+
+
+class CategoryBatchUpdateSchema(CategoryCreateSchema):
+    """
+    Category update schema for batches
+    """
+
+    id: int
+
+
+class CategoryBatchSchema(BaseModel):
+    """
+    Category batch schema
+    """
+
+    create: list[CategoryCreateSchema] = Field(default=[], max_length=BATCH_MAX_SIZE)
+    update: list[CategoryBatchUpdateSchema] = Field(default=[], max_length=BATCH_MAX_SIZE)
+    delete: list[int] = Field(default=[], max_length=BATCH_MAX_SIZE)
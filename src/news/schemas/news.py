@@ -3,12 +3,18 @@ Pydantic schemas for News
 """
 
 from datetime import datetime
+from typing import Literal
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, computed_field
 
-from .categories import CategoryReadSchema
+from src.media.variants import get_variants
+
+from .batch import BATCH_MAX_SIZE
+from .categories import CategoryBriefSchema
 from .comments import CommentReadSchema
 
+NewsOrdering = Literal["created", "-created", "updated", "-updated", "id", "-id"]
+
 
 class NewsReadSchema(BaseModel):
     """
@@ -24,14 +30,68 @@ class NewsReadSchema(BaseModel):
     created: datetime
     updated: datetime
     category_id: int | None = None
+    comment_count: int = 0
+
+    @computed_field
+    @property
+    def image_variants(self) -> list[dict[str, str]]:
+        """
+        Resized variants of images in the same order, generated in background,
+        so clients should fall back to the original until a variant exists
+        """
+        return [get_variants(image) if image else {} for image in self.images]
 
 
 class NewsReadDetailsSchema(NewsReadSchema):
     """
-    News read schema with detailed category data
+    News read schema with detailed category data and the latest comments, \n
+    the rest is available from /news/{news_id}/comments?cursor=comments_next_cursor \n
     """
 
     model_config = ConfigDict(from_attributes=True)
 
-    category: CategoryReadSchema | None = None
+    category: CategoryBriefSchema | None = None
     comments: list[CommentReadSchema] = []
+    comments_next_cursor: str | None = None
+
+
+class NewsSearchResultSchema(NewsReadSchema):
+    """
+    News search result schema with rank, highlighted content snippet
+    and the whole title with highlighted matches
+    """
+
+    rank: float
+    snippet: str | None = None
+    title_snippet: str | None = None
+
+
+class NewsCreateSchema(BaseModel):
+    """
+    News create schema for JSON batches, images are paths of already stored media
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    title: str = Field(max_length=100)
+    content: str | None = None
+    images: list[str] = []
+    category_id: int
+
+
+class NewsBatchUpdateSchema(NewsCreateSchema):
+    """
+    News update schema for JSON batches
+    """
+
+    id: int
+
+
+class NewsBatchSchema(BaseModel):
+    """
+    News batch schema
+    """
+
+    create: list[NewsCreateSchema] = Field(default=[], max_length=BATCH_MAX_SIZE)
+    update: list[NewsBatchUpdateSchema] = Field(default=[], max_length=BATCH_MAX_SIZE)
+    delete: list[int] = Field(default=[], max_length=BATCH_MAX_SIZE)
@@ -9,8 +9,11 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.manager import DBManager
+from src.pagination import Page, Pagination
+from src.redis import invalidate_tags
 
 from ..models import Category
+from ..schemas import CategoryBatchSchema
 
 class CategoryService():
 
@@ -20,11 +23,23 @@ class CategoryService():
         db: AsyncSession,
         offset: int = 0,
         limit: int = 10,
-    ) -> Sequence[Category]:
+        cursor: str | None = None,
+        pagination: Pagination = "offset",
+        columns: Sequence[str] | None = None,
+        envelope: bool = False,
+    ) -> Sequence[Category] | Page:
         """
         Service
         """
-        return await DBManager.get_objects(db, model=Category, offset=offset, limit=limit)
+        if pagination == "cursor" or cursor is not None:
+            return await DBManager.get_page(
+                db, model=Category, cursor=cursor, limit=limit, order_by="id", columns=columns, estimate=envelope
+            )
+
+        if envelope:
+            return await DBManager.get_envelope(db, model=Category, offset=offset, limit=limit, order_by="id", columns=columns)
+
+        return await DBManager.get_objects(db, model=Category, offset=offset, limit=limit, order_by="id", columns=columns)
 
 
     @classmethod
@@ -52,7 +67,9 @@ class CategoryService():
         """
         Service
         """
-        return await DBManager.create_object(**category, db=db, model=Category, commit=True)
+        category = await DBManager.create_object(**category, db=db, model=Category, commit=True)
+        await invalidate_tags("category:list")
+        return category
 
 
     @classmethod
@@ -65,6 +82,7 @@ class CategoryService():
         Service
         """
         await DBManager.delete_object(db=db, model=Category, field="id", value=category_id, commit=True)
+        await invalidate_tags("category:list", f"category:{category_id}", "news:list")
 
 
     @classmethod
@@ -85,4 +103,48 @@ class CategoryService():
 
         if category is None:
             raise HTTPException(status_code=404, detail="Category not found")
+
+        await invalidate_tags("category:list", f"category:{category_id}")
         return category
+
+
+    @classmethod
+    async def batch_categories(
+        cls,
+        db: AsyncSession,
+        batch: CategoryBatchSchema,
+    ) -> dict:
+        """
+        Service \n
+        Creates, updates and deletes categories in one transaction with bulk statements \n
+        """
+        results = []
+
+        created = await DBManager.bulk_create(db, model=Category, rows=[item.model_dump() for item in batch.create])
+        for index, category in enumerate(created):
+            results.append({"action": "create", "index": index, "status": 201, "id": category.id, "item": category})
+
+        updated = {
+            category.id: category
+            for category in await DBManager.bulk_update(
+                db, model=Category, rows=[item.model_dump() for item in batch.update]
+            )
+        }
+        for index, item in enumerate(batch.update):
+            if item.id in updated:
+                results.append({"action": "update", "index": index, "status": 200, "id": item.id, "item": updated[item.id]})
+            else:
+                results.append({"action": "update", "index": index, "status": 404, "detail": "Category not found"})
+
+        deleted = await DBManager.bulk_delete(db, model=Category, field="id", values=batch.delete)
+        for index, category_id in enumerate(batch.delete):
+            if category_id in deleted:
+                results.append({"action": "delete", "index": index, "status": 204, "id": category_id})
+            else:
+                results.append({"action": "delete", "index": index, "status": 404, "detail": "Category not found"})
+
+        await DBManager.commit_detached(db, [*created, *updated.values()])
+
+        changed = [f"category:{category_id}" for category_id in [*updated, *deleted]]
+        await invalidate_tags("category:list", *changed, *(["news:list"] if deleted else []))
+        return {"results": results}
@@ -3,18 +3,25 @@ Services module contains business logic
 """
 
 from typing import Sequence
-from datetime import datetime
 
 from fastapi import HTTPException
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.celery import invalidate_deferred_tags
+from src.environs import NEWS_COMMENT_COUNT_DELAY
 from src.manager import DBManager
+from src.pagination import Page, Pagination
+from src.redis import defer_invalidation, invalidate_tags
 from src.users import User
 
-from ..models import Comment
-from .news import NewsService
+from ..models import Comment, News
 
+COMMENT_FILTERS = {
+    "news_id": ("eq",),
+    "user_id": ("eq",),
+    "created": ("gt", "lt"),
+}
 
 
 class CommentService():
@@ -25,11 +32,55 @@ class CommentService():
         db: AsyncSession,
         offset: int = 0,
         limit: int = 10,
-    ) -> Sequence[Comment]:
+        cursor: str | None = None,
+        pagination: Pagination = "offset",
+        columns: Sequence[str] | None = None,
+        envelope: bool = False,
+        filters: dict | None = None,
+    ) -> Sequence[Comment] | Page:
+        """
+        Service \n
+        filters are checked against COMMENT_FILTERS,
+        created bounds prune comment partitions \n
+        """
+        filters = DBManager.check_filters(filters or {}, COMMENT_FILTERS)
+        if pagination == "cursor" or cursor is not None:
+            return await DBManager.get_page(
+                db,
+                model=Comment,
+                filters=filters,
+                cursor=cursor,
+                limit=limit,
+                order_by="-created",
+                columns=columns,
+                estimate=envelope,
+            )
+
+        if envelope:
+            return await DBManager.get_envelope(
+                db, model=Comment, filters=filters, offset=offset, limit=limit, order_by="-created", columns=columns
+            )
+
+        return await DBManager.get_objects(
+            db, model=Comment, filters=filters, offset=offset, limit=limit, order_by="-created", columns=columns
+        )
+
+
+    @classmethod
+    async def get_news_comments(
+        cls,
+        db: AsyncSession,
+        news_id: int,
+        cursor: str | None = None,
+        limit: int = 10,
+    ) -> Page:
         """
         Service
         """
-        return await DBManager.get_objects(db, model=Comment, offset=offset, limit=limit)
+        page = await DBManager.get_page(db, model=Comment, filters={"news_id": news_id}, cursor=cursor, limit=limit)
+        if not page.items and not await DBManager.get_existing(db, model=News, field="id", values=[news_id]):
+            raise HTTPException(status_code=404, detail="News not found")
+        return page
 
 
     @classmethod
@@ -48,6 +99,16 @@ class CommentService():
         return comment
 
 
+    @classmethod
+    async def invalidate_comment_counts(cls) -> None:
+        """
+        comment_count of cached news lists is refreshed at most once per
+        NEWS_COMMENT_COUNT_DELAY seconds, so comments do not drop every cached page
+        """
+        if await defer_invalidation("news:counts", NEWS_COMMENT_COUNT_DELAY):
+            invalidate_deferred_tags.apply_async(args=[["news:counts"]], countdown=NEWS_COMMENT_COUNT_DELAY)
+
+
     @classmethod
     async def create_comment(
         cls,
@@ -58,10 +119,29 @@ class CommentService():
         """
         Service
         """
-        await NewsService.get_news_object(db, comment["news_id"])
+        if not await DBManager.get_existing(db, model=News, field="id", values=[comment["news_id"]]):
+            raise HTTPException(status_code=404, detail="News not found")
 
         comment["user_id"] = user.id
-        return await DBManager.create_object(**comment, db=db, model=Comment, commit=True)
+        comment = await DBManager.create_object(**comment, db=db, model=Comment, commit=True)
+        await invalidate_tags("comment:list", f"news:{comment.news_id}", f"news:{comment.news_id}:comments")
+        await cls.invalidate_comment_counts()
+        return comment
+
+
+    @classmethod
+    async def get_write_error(
+        cls,
+        db: AsyncSession,
+        comment_id: int,
+        action: str,
+    ) -> HTTPException:
+        """
+        Explains why an owner-restricted write matched no rows
+        """
+        if await DBManager.get_existing(db, model=Comment, field="id", values=[comment_id]):
+            return HTTPException(status_code=403, detail=f"You are not allowed to {action} this comment")
+        return HTTPException(status_code=404, detail="Comment not found")
 
 
     @classmethod
@@ -75,11 +155,16 @@ class CommentService():
         Service
         """
 
-        comment = await DBManager.get_objects(db, model=Comment, field="id", value=comment_id)
-        if comment.user_id != user.id:
-            raise HTTPException(status_code=403, detail="You are not allowed to delete this comment")
+        comment = await DBManager.delete_object(
+            db=db, model=Comment, field="id", value=comment_id, owner_field="user_id", owner=user.id, commit=True
+        )
+        if comment is None:
+            raise await cls.get_write_error(db, comment_id, "delete")
 
-        await DBManager.delete_object(db=db, model=Comment, field="id", value=comment_id, commit=False)
+        await invalidate_tags(
+            "comment:list", f"comment:{comment_id}", f"news:{comment.news_id}", f"news:{comment.news_id}:comments"
+        )
+        await cls.invalidate_comment_counts()
 
 
     @classmethod
@@ -89,22 +174,22 @@ class CommentService():
         comment_id: int,
         comment: dict,
         user: User,
+        partial: bool = False,
     ) -> Comment:
         """
         Service
         """
 
-        comment['updated_at'] = datetime.utcnow()
-        comment: Comment = await DBManager.update_object(**comment, db=db, model=Comment, field="id", value=comment_id, commit=False)
-
+        update = DBManager.partial_update_object if partial else DBManager.update_object
+        comment: Comment = await update(
+            **comment, db=db, model=Comment, field="id", value=comment_id, owner_field="user_id", owner=user.id, commit=True
+        )
         if comment is None:
-            raise HTTPException(status_code=404, detail="Comment not found")
-
-        if comment.user_id != user.id:
-            raise HTTPException(status_code=403, detail="You are not allowed to update this comment")
+            raise await cls.get_write_error(db, comment_id, "update")
 
-        await db.commit()
-        await db.refresh(comment)
+        await invalidate_tags(
+            "comment:list", f"comment:{comment_id}", f"news:{comment.news_id}", f"news:{comment.news_id}:comments"
+        )
         return comment
 
 
@@ -119,19 +204,4 @@ class CommentService():
         """
         Service
         """
-
-        if comment["category_id"]:
-            await NewsService.get_news_object(db, comment["news_id"])
-
-        comment['updated_at'] = datetime.utcnow()
-        comment: Comment = await DBManager.partial_update_object(**comment, db=db, model=Comment, field="id", value=comment_id, commit=True)
-
-        if comment is None:
-            raise HTTPException(status_code=404, detail="Comment not found")
-
-        if comment.user_id != user.id:
-            raise HTTPException(status_code=403, detail="You are not allowed to update this comment")
-
-        await db.commit()
-        await db.refresh(comment)
-        return comment
+        return await cls.update_comment(db, comment_id, comment, user=user, partial=True)
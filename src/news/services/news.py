@@ -4,18 +4,31 @@ Services module contains business logic
 
 import asyncio
 from typing import Sequence
-from datetime import datetime
 
 from fastapi import HTTPException
 
+from sqlalchemy import select, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from ..models import News
-from ..utils import save_media
+from ..models import News, Comment, Category, SEARCH_CONFIG
+from ..schemas import NewsBatchSchema, NewsCreateSchema
+from ..utils import save_media_files, check_media_paths
 from .categories import CategoryService
 
+from src.celery import generate_media_variants
+from src.environs import NEWS_COMMENTS_PREVIEW_LIMIT
 from src.manager import DBManager
+from src.pagination import Page, Pagination, encode_cursor, decode_cursor
+from src.redis import invalidate_tags
+
+NEWS_FILTERS = {
+    "category_id": ("eq",),
+    "created": ("gt", "lt"),
+}
+
+SEARCH_HEADLINE_OPTIONS = "MaxFragments=2, MaxWords=30, MinWords=10, StartSel=<mark>, StopSel=</mark>"
+SEARCH_TITLE_HEADLINE_OPTIONS = "HighlightAll=true, StartSel=<mark>, StopSel=</mark>"
 
 
 class NewsService():
@@ -26,11 +39,38 @@ class NewsService():
         db: AsyncSession,
         offset: int = 0,
         limit: int = 10,
-    ) -> Sequence[News]:
+        cursor: str | None = None,
+        pagination: Pagination = "offset",
+        columns: Sequence[str] | None = None,
+        envelope: bool = False,
+        filters: dict | None = None,
+        order_by: str = "-created",
+    ) -> Sequence[News] | Page:
         """
-        Service
+        Service \n
+        filters are checked against NEWS_FILTERS \n
         """
-        return await DBManager.get_objects(db, model=News, offset=offset, limit=limit)
+        filters = DBManager.check_filters(filters or {}, NEWS_FILTERS)
+        if pagination == "cursor" or cursor is not None:
+            return await DBManager.get_page(
+                db,
+                model=News,
+                filters=filters,
+                cursor=cursor,
+                limit=limit,
+                order_by=order_by,
+                columns=columns,
+                estimate=envelope,
+            )
+
+        if envelope:
+            return await DBManager.get_envelope(
+                db, model=News, filters=filters, offset=offset, limit=limit, order_by=order_by, columns=columns
+            )
+
+        return await DBManager.get_objects(
+            db, model=News, filters=filters, offset=offset, limit=limit, order_by=order_by, columns=columns
+        )
 
 
     @classmethod
@@ -40,20 +80,73 @@ class NewsService():
         news_id: int,
     ) -> News:
         """
-        Service
+        Service \n
+        Embeds only the latest NEWS_COMMENTS_PREVIEW_LIMIT comments and a cursor for the rest \n
         """
         news = await DBManager.get_object(
             db=db,
             model=News,
             field="id",
             value=news_id,
-            options=[joinedload(News.category), joinedload(News.comments)]
+            joined=("category",),
         )
         if news is None:
             raise HTTPException(status_code=404, detail="News not found")
+
+        comments = await DBManager.get_page(
+            db, model=Comment, filters={"news_id": news_id}, limit=NEWS_COMMENTS_PREVIEW_LIMIT
+        )
+        set_committed_value(news, "comments", comments.items)
+        news.comments_next_cursor = comments.next_cursor
         return news
 
 
+    @classmethod
+    async def search_news(
+        cls,
+        db: AsyncSession,
+        q: str,
+        category_id: int | None = None,
+        cursor: str | None = None,
+        limit: int = 10,
+    ) -> Page:
+        """
+        Service \n
+        Full text search over title and content using the GIN indexed search_vector \n
+        Results are ordered by rank and keyset paginated over (rank, id),
+        snippets and highlighted titles are built only for the returned page \n
+        """
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        rank = func.ts_rank_cd(News.search_vector, query).label("rank")
+
+        matches = select(News.id, rank).where(News.search_vector.bool_op("@@")(query))
+        if category_id is not None:
+            matches = matches.where(News.category_id == category_id)
+        if cursor:
+            (after_rank, after_id), _ = decode_cursor(cursor, "-rank", [float, int])
+            matches = matches.where(tuple_(rank, News.id) < tuple_(after_rank, after_id))
+        matches = matches.order_by(rank.desc(), News.id.desc()).limit(limit + 1).subquery()
+
+        snippet = func.ts_headline(SEARCH_CONFIG, func.coalesce(News.content, ""), query, SEARCH_HEADLINE_OPTIONS)
+        title_snippet = func.ts_headline(SEARCH_CONFIG, News.title, query, SEARCH_TITLE_HEADLINE_OPTIONS)
+        result = await db.execute(
+            select(News, matches.c.rank, snippet, title_snippet)
+            .join(matches, News.id == matches.c.id)
+            .order_by(matches.c.rank.desc(), News.id.desc())
+        )
+        rows = result.all()
+
+        items = []
+        for news, news_rank, news_snippet, news_title_snippet in rows[:limit]:
+            news.rank, news.snippet, news.title_snippet = news_rank, news_snippet, news_title_snippet
+            items.append(news)
+
+        page = Page(items=items, has_more=len(rows) > limit)
+        if page.has_more:
+            page.next_cursor = encode_cursor("-rank", [items[-1].rank, items[-1].id])
+        return page
+
+
     @classmethod
     async def create_news(
         cls,
@@ -66,9 +159,12 @@ class NewsService():
 
         await CategoryService.get_category(db, category_id=news["category_id"])
 
-        news["images"] = await asyncio.gather(*[save_media(file) for file in news["images"]])
+        news["images"] = await save_media_files(news["images"])
 
-        return await DBManager.create_object(**news, db=db, model=News, commit=True)
+        news = await DBManager.create_object(**news, db=db, model=News, commit=True)
+        cls.enqueue_variants(news.images)
+        await invalidate_tags("news:list", "category:counts")
+        return news
 
 
     @classmethod
@@ -81,6 +177,9 @@ class NewsService():
         Service
         """
         await DBManager.delete_object(db=db, model=News, field="id", value=news_id, commit=True)
+        await invalidate_tags(
+            "news:list", "category:counts", f"news:{news_id}", f"news:{news_id}:comments", "comment:list"
+        )
 
 
     @classmethod
@@ -96,13 +195,15 @@ class NewsService():
 
         await CategoryService.get_category(db=db, category_id=news["category_id"])
 
-        news["images"] = await asyncio.gather(*[save_media(file) for file in news["images"]])
-        news["updated_at"] = datetime.utcnow()
+        news["images"] = await save_media_files(news["images"])
 
         news = await DBManager.update_object(**news, db=db, model=News, field="id", value=news_id, commit=True)
 
         if news is None:
             raise HTTPException(status_code=404, detail="News not found")
+
+        cls.enqueue_variants(news.images)
+        await invalidate_tags("news:list", "category:counts", f"news:{news_id}")
         return news
 
 
@@ -121,11 +222,103 @@ class NewsService():
             await CategoryService.get_category(db=db, category_id=news["category_id"])
 
         if news["images"]:
-            news["images"] = await asyncio.gather(*[save_media(file) for file in news["images"]])
-        news["updated_at"] = datetime.utcnow()
+            news["images"] = await save_media_files(news["images"])
+        uploaded = news["images"]
 
         news = await DBManager.partial_update_object(**news, db=db, model=News, field="id", value=news_id, commit=True)
 
         if news is None:
             raise HTTPException(status_code=404, detail="News not found")
+
+        cls.enqueue_variants(uploaded)
+        await invalidate_tags("news:list", "category:counts", f"news:{news_id}")
         return news
+
+
+    @classmethod
+    def enqueue_variants(cls, images: Sequence[str | None]) -> None:
+        """
+        Schedules generation of resized image variants, request only stores originals
+        """
+        images = [image for image in images or [] if image]
+        if images:
+            generate_media_variants.apply_async(args=[images])
+
+
+    @classmethod
+    async def get_batch_error(
+        cls,
+        item: NewsCreateSchema,
+        categories: set[int],
+    ) -> HTTPException | None:
+        """
+        Explains why a batch item can not be written, None if it can
+        """
+        if item.category_id not in categories:
+            return HTTPException(status_code=404, detail="Category not found")
+        return await check_media_paths(item.images)
+
+
+    @classmethod
+    async def batch_news(
+        cls,
+        db: AsyncSession,
+        batch: NewsBatchSchema,
+    ) -> dict:
+        """
+        Service \n
+        Creates, updates and deletes news in one transaction with bulk statements \n
+        Images must be existing files inside MEDIA_ROOT \n
+        """
+        results = []
+        categories = await DBManager.get_existing(
+            db, model=Category, field="id", values=[item.category_id for item in batch.create + batch.update]
+        )
+        create_errors, update_errors = [
+            await asyncio.gather(*[cls.get_batch_error(item, categories) for item in items])
+            for items in (batch.create, batch.update)
+        ]
+
+        created = await DBManager.bulk_create(
+            db,
+            model=News,
+            rows=[item.model_dump() for item, error in zip(batch.create, create_errors) if error is None],
+        )
+        created_news = iter(created)
+        for index, error in enumerate(create_errors):
+            if error is None:
+                news = next(created_news)
+                results.append({"action": "create", "index": index, "status": 201, "id": news.id, "item": news})
+            else:
+                results.append({"action": "create", "index": index, "status": error.status_code, "detail": error.detail})
+
+        updated = {
+            news.id: news
+            for news in await DBManager.bulk_update(
+                db,
+                model=News,
+                rows=[item.model_dump() for item, error in zip(batch.update, update_errors) if error is None],
+            )
+        }
+        for index, (item, error) in enumerate(zip(batch.update, update_errors)):
+            if error is not None:
+                results.append({"action": "update", "index": index, "status": error.status_code, "detail": error.detail})
+            elif item.id not in updated:
+                results.append({"action": "update", "index": index, "status": 404, "detail": "News not found"})
+            else:
+                results.append({"action": "update", "index": index, "status": 200, "id": item.id, "item": updated[item.id]})
+
+        deleted = await DBManager.bulk_delete(db, model=News, field="id", values=batch.delete)
+        for index, news_id in enumerate(batch.delete):
+            if news_id in deleted:
+                results.append({"action": "delete", "index": index, "status": 204, "id": news_id})
+            else:
+                results.append({"action": "delete", "index": index, "status": 404, "detail": "News not found"})
+
+        await DBManager.commit_detached(db, [*created, *updated.values()])
+        cls.enqueue_variants([image for news in [*created, *updated.values()] for image in news.images])
+
+        changed = [f"news:{news_id}" for news_id in [*updated, *deleted]]
+        changed += [f"news:{news_id}:comments" for news_id in deleted]
+        await invalidate_tags("news:list", "category:counts", *changed, *(["comment:list"] if deleted else []))
+        return {"results": results}
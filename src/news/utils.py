@@ -3,17 +3,117 @@ Utils
 """
 
 import os
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Sequence
+
 import aiofiles
-from fastapi import UploadFile
+import aiofiles.os
+import aiofiles.tempfile
+from fastapi import HTTPException, UploadFile
+
+from ..environs import MEDIA_ROOT, MEDIA_MAX_FILE_SIZE, MEDIA_MAX_REQUEST_SIZE, MEDIA_IO_WORKERS
+from ..media.variants import MEDIA_FILE_MODE
+
+MEDIA_CHUNK_SIZE = 1024 * 1024
+
+# Media file I/O runs on its own bounded pool, so large uploads can neither
+# exhaust the default executor nor start an unbounded number of threads
+media_executor = ThreadPoolExecutor(max_workers=MEDIA_IO_WORKERS, thread_name_prefix="media-io")
+
+
+def check_media_sizes(upload_files: Sequence[UploadFile]) -> None:
+    """
+    Rejects uploads over MEDIA_MAX_FILE_SIZE per file or MEDIA_MAX_REQUEST_SIZE
+    in total before anything is written
+    """
+    sizes = [upload_file.size or 0 for upload_file in upload_files]
+    if any(size > MEDIA_MAX_FILE_SIZE for size in sizes):
+        raise HTTPException(status_code=413, detail=f"File size exceeds {MEDIA_MAX_FILE_SIZE} bytes")
+    if sum(sizes) > MEDIA_MAX_REQUEST_SIZE:
+        raise HTTPException(status_code=413, detail=f"Total files size exceeds {MEDIA_MAX_REQUEST_SIZE} bytes")
+
+
+def media_path(digest: str, filename: str | None) -> str:
+    """
+    Content addressed path MEDIA_ROOT/ab/cd/<sha256><extension> \n
+    Extension of the original name is kept for content type detection \n
+    """
+    extension = os.path.splitext(os.path.basename(filename or ""))[1].lower()
+    if not extension[1:].isalnum():
+        extension = ""
+    return os.path.join(MEDIA_ROOT, digest[:2], digest[2:4], digest + extension)
 
-from ..environs import MEDIA_ROOT
 
+def read_chunk(upload_file: UploadFile, digest: Any) -> bytes:
+    """
+    Reads next MEDIA_CHUNK_SIZE chunk of upload and adds it to digest
+    """
+    chunk = upload_file.file.read(MEDIA_CHUNK_SIZE)
+    digest.update(chunk)
+    return chunk
 
 
 async def save_media(upload_file: UploadFile) -> str:
-    file_path = os.path.join(MEDIA_ROOT, upload_file.filename)
+    """
+    Stores upload under its content addressed path \n
+    Upload is read once: streamed to a temporary file in MEDIA_CHUNK_SIZE chunks
+    while hashed, then atomically renamed, so partially written files are never
+    visible. Already stored content is kept and the temporary file is dropped \n
+    """
+    loop = asyncio.get_running_loop()
+    digest, size = hashlib.sha256(), 0
 
-    async with aiofiles.open(file=file_path, mode="wb") as file:
-        await file.write(await upload_file.read())
+    async with aiofiles.tempfile.NamedTemporaryFile(
+        dir=MEDIA_ROOT, prefix=".upload-", delete=False, executor=media_executor
+    ) as file:
+        temp_path = file.name
+        try:
+            await loop.run_in_executor(media_executor, upload_file.file.seek, 0)
+            while chunk := await loop.run_in_executor(media_executor, read_chunk, upload_file, digest):
+                size += len(chunk)
+                if size > MEDIA_MAX_FILE_SIZE:
+                    raise HTTPException(status_code=413, detail=f"File size exceeds {MEDIA_MAX_FILE_SIZE} bytes")
+                await file.write(chunk)
+        except BaseException:
+            await aiofiles.os.remove(temp_path, executor=media_executor)
+            raise
 
+    file_path = media_path(digest.hexdigest(), upload_file.filename)
+    if await aiofiles.os.path.exists(file_path, executor=media_executor):
+        await aiofiles.os.remove(temp_path, executor=media_executor)
+        return file_path
+
+    await loop.run_in_executor(media_executor, os.chmod, temp_path, MEDIA_FILE_MODE)
+    await aiofiles.os.makedirs(os.path.dirname(file_path), exist_ok=True, executor=media_executor)
+    await aiofiles.os.replace(temp_path, file_path, executor=media_executor)
     return file_path
+
+
+def is_media_path(path: str) -> bool:
+    """
+    Checks that path is normalized and points inside MEDIA_ROOT
+    """
+    root = os.path.abspath(MEDIA_ROOT)
+    return os.path.normpath(path) == path and os.path.commonpath([root, os.path.abspath(path)]) == root
+
+
+async def check_media_paths(paths: Sequence[str]) -> HTTPException | None:
+    """
+    Explains why paths of already stored media can not be referenced, None if all can
+    """
+    for path in paths:
+        if not is_media_path(path):
+            return HTTPException(status_code=400, detail=f"Image {path} is not a media path")
+        if not await aiofiles.os.path.isfile(path, executor=media_executor):
+            return HTTPException(status_code=404, detail=f"Image {path} not found")
+    return None
+
+
+async def save_media_files(upload_files: Sequence[UploadFile]) -> list[str]:
+    """
+    Checks size limits and saves uploads concurrently
+    """
+    check_media_sizes(upload_files)
+    return list(await asyncio.gather(*[save_media(upload_file) for upload_file in upload_files]))
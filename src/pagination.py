@@ -0,0 +1,60 @@
+"""
+Cursor pagination helpers
+"""
+
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Generic, Literal, TypeVar
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict
+
+T = TypeVar("T")
+
+Pagination = Literal["offset", "cursor"]
+
+
+class Page(BaseModel, Generic[T]):
+    """
+    Paginated response schema, cursors are set for keyset pagination only \n
+    total_estimate is approximate and only present when requested \n
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    items: list[T]
+    has_more: bool = False
+    total_estimate: int | None = None
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+
+def encode_cursor(order_by: str, values: list[Any], backwards: bool = False) -> str:
+    """
+    Builds opaque cursor from ordering key values of a row
+    """
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps([order_by, values, backwards], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, types: list[type]) -> tuple[list[Any], bool]:
+    """
+    Returns ordering key values and direction stored in cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_order_by, values, backwards = json.loads(raw)
+        if cursor_order_by != order_by or len(values) != len(types):
+            raise ValueError
+        values = [
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(values, types)
+        ]
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return values, bool(backwards)
+
@@ -1,34 +1,441 @@
+import json
+import time
+import uuid
 import random
 import string
 import pickle
+import asyncio
+import inspect
+import logging
 import functools
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable
 
+from fastapi import HTTPException, Request
+from pydantic import TypeAdapter
 from redis import asyncio as aioredis
 
-from .environs import REDIS_URL
+from .database import async_session, get_read_sessionmaker
+from .responses import (
+    render_response,
+    http_date,
+    pack_response,
+    unpack_response,
+    is_not_modified,
+    not_modified_response,
+)
+from .environs import (
+    REDIS_URL,
+    CACHE_LOCAL_MAXSIZE,
+    CACHE_LOCAL_TTL,
+    CACHE_STALE_TTL,
+    CACHE_LOCK_TIMEOUT,
+    CACHE_TAG_TTL,
+    DB_READ_YOUR_WRITES_WINDOW,
+)
+
+logger = logging.getLogger(__name__)
 
 redis_client = aioredis.from_url(url=REDIS_URL)
 
+INVALIDATION_CHANNEL = "cache:invalidate"
+TAG_PREFIX = "cache:tag:"
+LOCK_PREFIX = "cache:lock:"
+DEFERRED_PREFIX = "cache:deferred:"
+
+# Waiters for a cache fill poll with exponential backoff between these delays
+WAIT_INITIAL_DELAY = 0.01
+WAIT_MAX_DELAY = 0.5
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+BUMP_TAG_SCRIPT = """
+local current = tonumber(redis.call("get", KEYS[1]) or "0")
+local version = tonumber(ARGV[1])
+if version <= current then
+    version = current + 1
+end
+redis.call("set", KEYS[1], string.format("%d", version), "EX", ARGV[2])
+return version
+"""
+
+background_tasks: set[asyncio.Task] = set()
+
 def generate_verification_code(length : int = 6) -> str:
     return "".join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
 
-def cache(expire_time: int = 60):
+class LocalCache():
+    """
+    Bounded in-process LRU cache with per entry TTL. \n
+    Used as L1 layer in front of redis, maxsize 0 disables it. \n
+    max_weight additionally bounds the total weight of values, measured by weigh
+    (e.g. bytes of cached bodies), 0 leaves it unbounded. \n
+    """
+
+    def __init__(self, maxsize: int, ttl: int, max_weight: int = 0, weigh: Callable[[Any], int] = len) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires < time.monotonic():
+            self.delete(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        if self.maxsize <= 0:
+            return
+
+        self.delete(key)
+        self._entries[key] = (time.monotonic() + min(ttl, self.ttl), value)
+        self.weight += self.weigh(value)
+        while len(self._entries) > self.maxsize or (self.max_weight and self.weight > self.max_weight):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.weight -= self.weigh(evicted)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.weight -= self.weigh(entry[1])
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.weight = 0
+
+
+local_cache = LocalCache(maxsize=CACHE_LOCAL_MAXSIZE, ttl=CACHE_LOCAL_TTL)
+
+
+async def broadcast_invalidation(*keys: str) -> None:
+    """
+    Drops keys from local cache of every worker
+    """
+    local_cache.delete(*keys)
+    await redis_client.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+
+
+async def get_tag_versions(*tags: str) -> list[bytes]:
+    """
+    Returns current generation of every tag. \n
+    Generations are microsecond timestamps of the last write. Missing ones are
+    initialized with a fresh timestamp just outside DB_READ_YOUR_WRITES_WINDOW:
+    it is unique, so a counter lost by redis never resurrects entries stored under
+    its old values, and old enough for cold entries to be filled from replicas. \n
+    Tags expire after CACHE_TAG_TTL, which outlives every entry stored under them. \n
+    """
+    keys = [TAG_PREFIX + tag for tag in tags]
+    versions = [local_cache.get(key) for key in keys]
+    missing = [index for index, version in enumerate(versions) if version is None]
+
+    if missing:
+        fetched = await redis_client.mget([keys[index] for index in missing])
+        for index, version in zip(missing, fetched):
+            if version is None:
+                version = str(time.time_ns() // 1000 - DB_READ_YOUR_WRITES_WINDOW * 1_000_000 - 1).encode()
+                if not await redis_client.set(keys[index], version, nx=True, ex=CACHE_TAG_TTL):
+                    version = await redis_client.get(keys[index])
+            versions[index] = version
+            local_cache.set(keys[index], version, CACHE_LOCAL_TTL)
+
+    return versions
+
+
+async def invalidate_tags(*tags: str) -> None:
+    """
+    Invalidates every cache entry marked with any of the tags in O(1). \n
+    Tag generation is a part of the cache key, so bumping it makes old entries
+    unreachable and they are evicted by TTL. \n
+    """
+    if not tags:
+        return
+
+    keys = [TAG_PREFIX + tag for tag in set(tags)]
+    now = time.time_ns() // 1000
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.eval(BUMP_TAG_SCRIPT, 1, key, now, CACHE_TAG_TTL)
+        await pipe.execute()
+
+    await broadcast_invalidation(*keys)
+
+
+async def defer_invalidation(tag: str, delay: int) -> bool:
+    """
+    Marks tag for invalidation in delay seconds, writes within the window share it. \n
+    Returns True if the caller has to schedule invalidate_deferred. \n
+    """
+    return bool(await redis_client.set(DEFERRED_PREFIX + tag, 1, nx=True, ex=delay))
+
+
+async def invalidate_deferred(*tags: str) -> None:
+    """
+    Invalidates deferred tags, marks are dropped first so writes racing
+    with the invalidation schedule a new one
+    """
+    await redis_client.delete(*[DEFERRED_PREFIX + tag for tag in tags])
+    await invalidate_tags(*tags)
+
+
+async def listen_invalidations() -> None:
+    """
+    Background task dropping local cache entries invalidated by any worker. \n
+    Local cache is cleared after reconnect, because messages may have been missed. \n
+    """
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                local_cache.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        local_cache.delete(*json.loads(message["data"]))
+        except aioredis.RedisError:
+            local_cache.clear()
+            await asyncio.sleep(1)
+
+
+async def acquire_lock(key: str) -> str | None:
+    """
+    Acquires cluster wide lock for cache filling, returns token on success
+    """
+    token = uuid.uuid4().hex
+    if await redis_client.set(LOCK_PREFIX + key, token, nx=True, px=CACHE_LOCK_TIMEOUT * 1000):
+        return token
+    return None
+
+
+async def release_lock(key: str, token: str) -> None:
+    """
+    Releases lock only if it is still owned by the token
+    """
+    await redis_client.eval(RELEASE_LOCK_SCRIPT, 1, LOCK_PREFIX + key, token)
+
+
+def pack_entry(payload: bytes, expire_time: int, dependencies: dict[str, bytes] | None = None) -> bytes:
+    """
+    Prefixes cached payload with the moment it becomes stale and
+    generations of tags resolved from the result
+    """
+    header = b"%.3f" % (time.time() + expire_time)
+    if dependencies:
+        header += b" " + b",".join(tag.encode() + b"=" + version for tag, version in dependencies.items())
+    return header + b"\n" + payload
+
+
+def unpack_entry(value: bytes) -> tuple[float, dict[str, bytes], bytes]:
+    """
+    Splits cached value into stale moment, tag dependencies and payload
+    """
+    header, payload = value.split(b"\n", 1)
+    fresh_until, _, tags = header.partition(b" ")
+    dependencies = {}
+    for item in filter(None, tags.split(b",")):
+        tag, _, version = item.partition(b"=")
+        dependencies[tag.decode()] = version
+    return float(fresh_until), dependencies, payload
+
+
+async def is_entry_current(dependencies: dict[str, bytes]) -> bool:
+    """
+    Checks that no tag resolved from the cached result was written since it was stored
+    """
+    if not dependencies:
+        return True
+    return await get_tag_versions(*dependencies) == list(dependencies.values())
+
+
+def is_result_tag(tag: str) -> bool:
+    return "{result" in tag
+
+
+def cache(expire_time: int = 60, response_model: Any = None, tags: tuple[str, ...] = ()):
+    """
+    Caches router results in redis. \n
+    Without response_model the returned value is pickled as is. \n
+    With response_model the already validated JSON body is cached and
+    hits are answered with a prebuilt Response, skipping ORM unpickling
+    and pydantic serialization. \n
+    Values are kept in the local L1 cache too, so hot keys skip the redis round trip. \n
+    Tags are formatted with router kwargs (e.g. "news:{news_id}") and entries
+    are invalidated by invalidate_tags on writes. \n
+    Tags referring to the result (e.g. "news:{result.news_id}:comments") are
+    resolved when the entry is filled, stored in it and checked on every hit. \n
+    Misses are filled by a single request per key across the cluster, others wait for it.
+    Expired entries are served for CACHE_STALE_TTL more seconds while one
+    background task refreshes them. \n
+    Cached responses carry ETag and conditional requests are answered with 304
+    straight from the cache. Last-Modified is the latest write time of the entry
+    tags, so it moves with every write invalidating the entry. \n
+    Entries whose tags were written within DB_READ_YOUR_WRITES_WINDOW are
+    filled from primary, so lagging replicas are never cached. \n
+    """
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+    key_tags = tuple(tag for tag in tags if not is_result_tag(tag))
+    result_tags = tuple(tag for tag in tags if is_result_tag(tag))
+    if tags and expire_time + CACHE_STALE_TTL >= CACHE_TAG_TTL:
+        raise ValueError("CACHE_TAG_TTL must be longer than expire_time plus CACHE_STALE_TTL")
+
+    def dump(result: Any, written: int) -> tuple[Any, bytes | None]:
+        if adapter is not None:
+            result = render_response(adapter, result)
+            if result.status_code != 200:
+                return result, None
+            # HTTP dates have second resolution, a write later in the same second would share it
+            if written and written // 1_000_000 < time.time_ns() // 1_000_000_000:
+                result.headers["Last-Modified"] = http_date(datetime.fromtimestamp(written / 1_000_000, timezone.utc))
+            return result, pack_response(result)
+        return result, pickle.dumps(result)
+
+    def load(payload: bytes) -> Any:
+        if adapter is not None:
+            return unpack_response(payload)
+        return pickle.loads(payload)
+
     def decorator(func):
+
+        async def store(key: str, payload: bytes, dependencies: dict[str, bytes]) -> None:
+            value = pack_entry(payload, expire_time, dependencies)
+            await redis_client.setex(key, expire_time + CACHE_STALE_TTL, value)
+            local_cache.set(key, value, expire_time)
+
+        async def fill(key: str, args: tuple, kwargs: dict, sessionmaker: Any = None, written: int = 0) -> Any:
+            if sessionmaker is not None and "db" in kwargs:
+                async with sessionmaker() as session:
+                    return await fill(key, args, {**kwargs, "db": session}, written=written)
+
+            started = time.time_ns() // 1000
+            result = await func(*args, **kwargs)
+
+            dependencies = {}
+            if result_tags:
+                entry_tags = [tag.format(result=result) for tag in result_tags]
+                dependencies = dict(zip(entry_tags, await get_tag_versions(*entry_tags)))
+
+            written = max([written, *(int(version) for version in dependencies.values())])
+            result, payload = dump(result, written)
+            # A dependency written during the fill may not be reflected in the result
+            if payload is not None and all(int(version) < started for version in dependencies.values()):
+                await store(key, payload, dependencies)
+            return result
+
+        async def refresh(key: str, token: str, args: tuple, kwargs: dict, primary: bool, written: int) -> None:
+            try:
+                sessionmaker = async_session if primary else get_read_sessionmaker()
+                await fill(key, args, kwargs, sessionmaker, written)
+            except HTTPException:
+                await redis_client.delete(key)
+            except Exception:
+                logger.exception("Cache refresh of %s failed", key)
+            finally:
+                await release_lock(key, token)
+
+        async def wait_for_filler(key: str) -> bytes | None:
+            # Lock released without a value means the filler failed (e.g. 404), stop waiting
+            deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+            delay = WAIT_INITIAL_DELAY
+            while time.monotonic() < deadline:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, WAIT_MAX_DELAY)
+                value, locked = await redis_client.mget([key, LOCK_PREFIX + key])
+                if value and await is_entry_current(unpack_entry(value)[1]):
+                    return value
+                if not locked:
+                    return None
+            return None
+
+        signature = inspect.signature(func)
+        inject_request = adapter is not None and not any(
+            parameter.annotation is Request for parameter in signature.parameters.values()
+        )
+
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
+            request = kwargs.pop("cache_request", None) if inject_request else None
+            result = await get_or_fill(args, kwargs)
+
+            if request is not None and is_not_modified(request, result):
+                return not_modified_response(result)
+            return result
+
+        async def get_or_fill(args: tuple, kwargs: dict) -> Any:
             kwargs_copy = kwargs.copy()
             kwargs_copy.pop("db", None)
             key = f"{func.__name__}@{args}@{kwargs_copy}"
+            if adapter is not None:
+                key = f"response:{key}"
+
+            primary, written = False, 0
+            if key_tags:
+                entry_tags = [tag.format(**kwargs) for tag in key_tags]
+                versions = await get_tag_versions(*entry_tags)
+                key += "@" + ",".join(
+                    f"{tag}={version.decode()}" for tag, version in zip(entry_tags, versions)
+                )
+                written = max(int(version) for version in versions)
+                primary = time.time_ns() // 1000 - written < DB_READ_YOUR_WRITES_WINDOW * 1_000_000
 
-            value = await redis_client.get(key)
+            value = local_cache.get(key)
+            if value is not None and unpack_entry(value)[0] < time.time():
+                value = None
+
+            if value is None:
+                value = await redis_client.get(key)
+                if value:
+                    local_cache.set(key, value, expire_time)
 
             if value:
-                return pickle.loads(value)
+                fresh_until, dependencies, payload = unpack_entry(value)
+                if not await is_entry_current(dependencies):
+                    # Dependency was just written, replicas may not have it yet
+                    local_cache.delete(key)
+                    value, primary = None, True
 
-            result = await func(*args, **kwargs)
-            await redis_client.setex(key, expire_time, pickle.dumps(result))
+            if value:
+                if fresh_until < time.time():
+                    token = await acquire_lock(key)
+                    if token is not None:
+                        task = asyncio.create_task(refresh(key, token, args, kwargs, primary, written))
+                        background_tasks.add(task)
+                        task.add_done_callback(background_tasks.discard)
+                return load(payload)
 
-            return result
+            sessionmaker = async_session if primary else None
+            token = await acquire_lock(key)
+            if token is None:
+                value = await wait_for_filler(key)
+                if value:
+                    local_cache.set(key, value, expire_time)
+                    return load(unpack_entry(value)[2])
+                return await fill(key, args, kwargs, sessionmaker, written)
+
+            try:
+                return await fill(key, args, kwargs, sessionmaker, written)
+            finally:
+                await release_lock(key, token)
+
+        if inject_request:
+            wrapper.__signature__ = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ])
         return wrapper
     return decorator
@@ -0,0 +1,111 @@
+"""
+Prebuilt JSON responses and HTTP validators
+"""
+
+import json
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+VALIDATOR_HEADERS = ("etag", "last-modified", "cache-control")
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Strong ETag computed from response body
+    """
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def http_date(value: datetime) -> str:
+    """
+    Formats datetime as HTTP date, naive datetimes are local time like stored timestamps
+    """
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def render_response(adapter: TypeAdapter, content: Any) -> Response:
+    """
+    Validates content against response model adapter and returns prebuilt JSON response
+    with ETag validator \n
+    Last-Modified is not derived from the content: deleted rows and counters
+    change the body without moving any timestamp in it \n
+    """
+    if isinstance(content, Response):
+        if "etag" not in content.headers:
+            content.headers["ETag"] = make_etag(content.body)
+        return content
+
+    validated = adapter.validate_python(content, from_attributes=True)
+    body = adapter.dump_json(validated)
+
+    headers = {"ETag": make_etag(body), "Cache-Control": "no-cache"}
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def pack_response(response: Response) -> bytes:
+    """
+    Serializes response status, media type, validators and body into a single cache value
+    """
+    meta = {
+        "status": response.status_code,
+        "media_type": response.media_type,
+        "headers": {
+            name: response.headers[name] for name in VALIDATOR_HEADERS if name in response.headers
+        },
+    }
+    return json.dumps(meta).encode() + b"\n" + response.body
+
+
+def unpack_response(value: bytes) -> Response:
+    """
+    Restores response from a value built by pack_response
+    """
+    meta, body = value.split(b"\n", 1)
+    meta = json.loads(meta)
+    return Response(
+        content=body,
+        status_code=meta["status"],
+        media_type=meta["media_type"],
+        headers=meta.get("headers"),
+    )
+
+
+def is_not_modified(request: Request, response: Response) -> bool:
+    """
+    Evaluates If-None-Match and If-Modified-Since request headers against response validators
+    """
+    if response.status_code != 200:
+        return False
+
+    if_none_match = request.headers.get("if-none-match")
+    etag = response.headers.get("etag")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    modified = response.headers.get("last-modified")
+    if if_modified_since is None or modified is None:
+        return False
+
+    try:
+        return parsedate_to_datetime(modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def not_modified_response(response: Response) -> Response:
+    """
+    Returns body-less 304 response carrying validators of the original one
+    """
+    headers = {
+        name: response.headers[name] for name in VALIDATOR_HEADERS if name in response.headers
+    }
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,101 @@
+"""
+Unit tests of the in-process cache layer
+
+Run without redis or database, only pure helpers of src.redis are exercised.
+"""
+
+import time
+
+from src.redis import LocalCache, pack_entry, unpack_entry
+
+
+def test_local_cache_get_set():
+    cache = LocalCache(maxsize=2, ttl=60)
+    cache.set("a", b"1", 60)
+    assert cache.get("a") == b"1"
+    assert cache.get("missing") is None
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(maxsize=2, ttl=60)
+    cache.set("a", b"1", 60)
+    cache.set("b", b"2", 60)
+    cache.get("a")
+    cache.set("c", b"3", 60)
+
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"3"
+
+
+def test_local_cache_expires_entries(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = LocalCache(maxsize=10, ttl=30)
+    cache.set("short", b"1", 5)
+    cache.set("long", b"2", 3600)
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 10)
+    assert cache.get("short") is None
+    assert cache.get("long") == b"2"
+
+    # Entry TTL is capped by the cache TTL
+    monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+    assert cache.get("long") is None
+
+
+def test_local_cache_delete_and_clear():
+    cache = LocalCache(maxsize=10, ttl=60)
+    cache.set("a", b"1", 60)
+    cache.set("b", b"2", 60)
+    cache.delete("a", "missing")
+    assert cache.get("a") is None
+    assert cache.get("b") == b"2"
+
+    cache.clear()
+    assert cache.get("b") is None
+
+
+def test_local_cache_disabled():
+    cache = LocalCache(maxsize=0, ttl=60)
+    cache.set("a", b"1", 60)
+    assert cache.get("a") is None
+
+
+def test_local_cache_evicts_by_weight():
+    cache = LocalCache(maxsize=10, ttl=60, max_weight=4)
+    cache.set("a", b"12", 60)
+    cache.set("b", b"34", 60)
+    cache.set("a", b"1", 60)
+    cache.set("c", b"56", 60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"56"
+    assert cache.weight == 3
+
+    cache.delete("a")
+    assert cache.weight == 2
+
+
+def test_pack_entry_round_trip():
+    payload = b'{"status": 200}\n[{"id": 1}]\nwith newlines'
+    before = time.time()
+    fresh_until, dependencies, unpacked = unpack_entry(pack_entry(payload, 60))
+
+    assert unpacked == payload
+    assert dependencies == {}
+    assert before + 59 < fresh_until < time.time() + 61
+
+
+def test_pack_entry_keeps_dependencies():
+    dependencies = {"news:1:comments": b"1760000000000000", "news:2:comments": b"0"}
+    _, unpacked_dependencies, payload = unpack_entry(pack_entry(b"payload", 60, dependencies))
+
+    assert unpacked_dependencies == dependencies
+    assert payload == b"payload"
+
+
+def test_packed_entry_is_stale_after_expire_time():
+    fresh_until, _, _ = unpack_entry(pack_entry(b"payload", -1))
+    assert fresh_until < time.time()
@@ -176,3 +176,388 @@ async def test_categories():
         assert response.status_code == 200
         assert isinstance(response.json(), list)
 
+
+
+@pytest.mark.anyio
+async def test_categories_not_modified():
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.get("/categories")
+        assert response.status_code == 200
+        assert "etag" in response.headers
+
+        headers = {"If-None-Match": response.headers["etag"]}
+        response = await client.get("/categories", headers=headers)
+        assert response.status_code == 304
+        assert response.content == b""
+
+
+@pytest.mark.anyio
+async def test_write_invalidates_cached_get(test_admin_user_data):
+    access_token = await test_login_as_admin(test_admin_user_data)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.post("/categories", json={"name": "Cached Category"}, headers=headers)
+        assert response.status_code == 200
+        category_id = response.json()["id"]
+
+        response = await client.get(f"/categories/{category_id}")
+        assert response.status_code == 200
+        assert response.json()["name"] == "Cached Category"
+        etag = response.headers["etag"]
+
+        response = await client.put(f"/categories/{category_id}", json={"name": "Renamed Category"}, headers=headers)
+        assert response.status_code == 200
+
+        response = await client.get(f"/categories/{category_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["name"] == "Renamed Category"
+
+        response = await client.delete(f"/categories/{category_id}", headers=headers)
+        assert response.status_code == 204
+
+        response = await client.get(f"/categories/{category_id}")
+        assert response.status_code == 404
+
+
+@pytest_asyncio.fixture
+async def test_categories_data(test_admin_user_data):
+    access_token = await test_login_as_admin(test_admin_user_data)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        category_ids = []
+        for index in range(5):
+            response = await client.post("/categories", json={"name": f"Paginated Category {index}"}, headers=headers)
+            assert response.status_code == 200
+            category_ids.append(response.json()["id"])
+
+    yield category_ids
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        for category_id in category_ids:
+            response = await client.delete(f"/categories/{category_id}", headers=headers)
+            assert response.status_code == 204
+
+
+@pytest.mark.anyio
+async def test_categories_cursor_round_trip(test_categories_data):
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.get("/categories", params={"pagination": "cursor", "limit": 2})
+        assert response.status_code == 200
+        first_page = response.json()
+        assert len(first_page["items"]) == 2
+        assert first_page["has_more"] == True
+        assert first_page["prev_cursor"] is None
+
+        response = await client.get("/categories", params={"cursor": first_page["next_cursor"], "limit": 2})
+        assert response.status_code == 200
+        second_page = response.json()
+        assert second_page["prev_cursor"] is not None
+        assert second_page["items"][0]["id"] > first_page["items"][-1]["id"]
+
+        response = await client.get("/categories", params={"cursor": second_page["prev_cursor"], "limit": 2})
+        assert response.status_code == 200
+        assert response.json()["items"] == first_page["items"]
+
+
+@pytest.mark.anyio
+async def test_categories_cursor_ordering_is_stable(test_categories_data):
+    async with AsyncClient(base_url=BASE_URL) as client:
+        ids = []
+        params = {"pagination": "cursor", "limit": 2}
+        while True:
+            response = await client.get("/categories", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            ids += [category["id"] for category in page["items"]]
+            if page["next_cursor"] is None:
+                break
+            params = {"cursor": page["next_cursor"], "limit": 2}
+
+        assert ids == sorted(set(ids))
+        assert set(test_categories_data) <= set(ids)
+
+
+@pytest.mark.anyio
+async def test_invalid_cursor():
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.get("/categories", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+        # Cursors are bound to the ordering they were issued for
+        response = await client.get("/news", params={"pagination": "cursor", "limit": 1})
+        assert response.status_code == 200
+        next_cursor = response.json()["next_cursor"]
+        if next_cursor is not None:
+            response = await client.get("/news", params={"cursor": next_cursor, "order_by": "id"})
+            assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_categories_batch(test_admin_user_data):
+    access_token = await test_login_as_admin(test_admin_user_data)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        batch = {"create": [{"name": "Batch Category"}, {"name": "Batch Category 2"}]}
+        response = await client.post("/categories/batch", json=batch, headers=headers)
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["status"] for result in results] == [201, 201]
+        first_id, second_id = [result["id"] for result in results]
+
+        batch = {
+            "update": [{"id": first_id, "name": "Batch Category Renamed"}, {"id": 0, "name": "Missing"}],
+            "delete": [second_id, 0],
+        }
+        response = await client.post("/categories/batch", json=batch, headers=headers)
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [(result["action"], result["status"]) for result in results] == [
+            ("update", 200), ("update", 404), ("delete", 204), ("delete", 404),
+        ]
+        assert results[0]["item"]["name"] == "Batch Category Renamed"
+
+        response = await client.get(f"/categories/{second_id}")
+        assert response.status_code == 404
+
+        response = await client.post("/categories/batch", json={"delete": [first_id]}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["results"][0]["status"] == 204
+
+
+@pytest.mark.anyio
+async def test_news_batch(test_admin_user_data):
+    access_token = await test_login_as_admin(test_admin_user_data)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.post("/categories", json={"name": "Batch News Category"}, headers=headers)
+        assert response.status_code == 200
+        category_id = response.json()["id"]
+
+        batch = {
+            "create": [
+                {"title": "Batch News", "category_id": category_id},
+                {"title": "Batch News Without Category", "category_id": 0},
+                {"title": "Batch News With Foreign Image", "category_id": category_id, "images": ["/etc/passwd"]},
+            ],
+            "delete": [0],
+        }
+        response = await client.post("/news/batch", json=batch, headers=headers)
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [(result["action"], result["status"]) for result in results] == [
+            ("create", 201), ("create", 404), ("create", 400), ("delete", 404),
+        ]
+        news_id = results[0]["id"]
+
+        batch = {"update": [{"id": news_id, "title": "Batch News Updated", "category_id": category_id}]}
+        response = await client.post("/news/batch", json=batch, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["results"][0]["status"] == 200
+        assert response.json()["results"][0]["item"]["title"] == "Batch News Updated"
+
+        response = await client.post("/news/batch", json={"delete": [news_id]}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["results"][0]["status"] == 204
+
+        response = await client.get(f"/news/{news_id}")
+        assert response.status_code == 404
+
+        response = await client.delete(f"/categories/{category_id}", headers=headers)
+        assert response.status_code == 204
+
+
+@pytest.mark.anyio
+async def test_invalid_batch_writes_nothing(test_admin_user_data):
+    access_token = await test_login_as_admin(test_admin_user_data)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.post("/categories", json={"name": "Rollback Category"}, headers=headers)
+        assert response.status_code == 200
+        category_id = response.json()["id"]
+
+        # The second title is too long, so the batch is rejected before the first one is written
+        batch = {
+            "create": [
+                {"title": "Rolled Back News", "category_id": category_id},
+                {"title": "x" * 101, "category_id": category_id},
+            ],
+        }
+        response = await client.post("/news/batch", json=batch, headers=headers)
+        assert response.status_code == 422
+
+        response = await client.post("/categories/batch", json={"create": [{"name": "x" * 101}]}, headers=headers)
+        assert response.status_code == 422
+
+        response = await client.get("/news", params={"category_id": category_id})
+        assert response.status_code == 200
+        assert response.json() == []
+
+        response = await client.delete(f"/categories/{category_id}", headers=headers)
+        assert response.status_code == 204
+
+
+@pytest_asyncio.fixture(scope="session")
+async def test_comments_data(test_user_data, test_admin_user_data):
+    admin_headers = {"Authorization": f"Bearer {await test_login_as_admin(test_admin_user_data)}"}
+    user_headers = {"Authorization": f"Bearer {await test_login(test_user_data)}"}
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.post("/categories", json={"name": "Comments Category"}, headers=admin_headers)
+        assert response.status_code == 200
+        category_id = response.json()["id"]
+
+        response = await client.post(
+            "/news/batch", json={"create": [{"title": "Commented News", "category_id": category_id}]}, headers=admin_headers
+        )
+        assert response.status_code == 200
+        news_id = response.json()["results"][0]["id"]
+
+        response = await client.post("/comments", json={"content": "Admin comment", "news_id": news_id}, headers=admin_headers)
+        assert response.status_code == 200
+        admin_comment = response.json()
+
+    yield {"user_headers": user_headers, "admin_comment": admin_comment, "news_id": news_id}
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.post("/news/batch", json={"delete": [news_id]}, headers=admin_headers)
+        assert response.status_code == 200
+        response = await client.delete(f"/categories/{category_id}", headers=admin_headers)
+        assert response.status_code == 204
+
+
+@pytest.mark.anyio
+async def test_comment_owner_can_update(test_comments_data):
+    headers = test_comments_data["user_headers"]
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        comment = {"content": "User comment", "news_id": test_comments_data["news_id"]}
+        response = await client.post("/comments", json=comment, headers=headers)
+        assert response.status_code == 200
+        created = response.json()
+
+        response = await client.put(f"/comments/{created['id']}", json={"content": "User comment edited"}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["content"] == "User comment edited"
+        assert response.json()["updated"] > created["updated"]
+
+        response = await client.get(f"/comments/{created['id']}")
+        assert response.status_code == 200
+        assert response.json()["content"] == "User comment edited"
+
+        response = await client.delete(f"/comments/{created['id']}", headers=headers)
+        assert response.status_code == 204
+
+
+@pytest.mark.anyio
+async def test_comment_of_another_user_is_forbidden(test_comments_data):
+    headers = test_comments_data["user_headers"]
+    comment = test_comments_data["admin_comment"]
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.put(f"/comments/{comment['id']}", json={"content": "Hijacked"}, headers=headers)
+        assert response.status_code == 403
+
+        response = await client.patch(f"/comments/{comment['id']}", json={"content": "Hijacked"}, headers=headers)
+        assert response.status_code == 403
+
+        response = await client.delete(f"/comments/{comment['id']}", headers=headers)
+        assert response.status_code == 403
+
+        response = await client.get(f"/comments/{comment['id']}")
+        assert response.status_code == 200
+        assert response.json()["content"] == "Admin comment"
+
+
+@pytest.mark.anyio
+async def test_missing_comment_is_not_found(test_comments_data):
+    headers = test_comments_data["user_headers"]
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.put("/comments/0", json={"content": "Missing"}, headers=headers)
+        assert response.status_code == 404
+
+        response = await client.delete("/comments/0", headers=headers)
+        assert response.status_code == 404
+
+
+@pytest_asyncio.fixture(scope="session")
+async def test_search_data(test_admin_user_data):
+    headers = {"Authorization": f"Bearer {await test_login_as_admin(test_admin_user_data)}"}
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        category_ids = []
+        for name in ("Search Category", "Other Search Category"):
+            response = await client.post("/categories", json={"name": name}, headers=headers)
+            assert response.status_code == 200
+            category_ids.append(response.json()["id"])
+
+        batch = {
+            "create": [
+                {"title": "Quokkazephyr sighting", "content": "Seen in the park", "category_id": category_ids[0]},
+                {"title": "Park report", "content": "A quokkazephyr was seen in the park", "category_id": category_ids[0]},
+                {"title": "Weather", "content": "Sunny, no quokkazephyr today", "category_id": category_ids[1]},
+            ],
+        }
+        response = await client.post("/news/batch", json=batch, headers=headers)
+        assert response.status_code == 200
+        news_ids = [result["id"] for result in response.json()["results"]]
+
+    yield {"category_ids": category_ids, "news_ids": news_ids}
+
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.post("/news/batch", json={"delete": news_ids}, headers=headers)
+        assert response.status_code == 200
+        for category_id in category_ids:
+            response = await client.delete(f"/categories/{category_id}", headers=headers)
+            assert response.status_code == 204
+
+
+@pytest.mark.anyio
+async def test_search_ranks_title_matches_first(test_search_data):
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.get("/news/search", params={"q": "quokkazephyr"})
+        assert response.status_code == 200
+        items = response.json()["items"]
+
+    assert sorted(item["id"] for item in items) == sorted(test_search_data["news_ids"])
+    assert items[0]["id"] == test_search_data["news_ids"][0]
+    assert [item["rank"] for item in items] == sorted((item["rank"] for item in items), reverse=True)
+    assert items[0]["title_snippet"] == "<mark>Quokkazephyr</mark> sighting"
+    assert "<mark>quokkazephyr</mark>" in items[1]["snippet"]
+
+
+@pytest.mark.anyio
+async def test_search_category_filter(test_search_data):
+    async with AsyncClient(base_url=BASE_URL) as client:
+        params = {"q": "quokkazephyr", "category_id": test_search_data["category_ids"][1]}
+        response = await client.get("/news/search", params=params)
+        assert response.status_code == 200
+
+    assert [item["id"] for item in response.json()["items"]] == [test_search_data["news_ids"][2]]
+
+
+@pytest.mark.anyio
+async def test_search_cursor_round_trip(test_search_data):
+    async with AsyncClient(base_url=BASE_URL) as client:
+        response = await client.get("/news/search", params={"q": "quokkazephyr", "limit": 3})
+        assert response.status_code == 200
+        expected = [item["id"] for item in response.json()["items"]]
+
+        seen, cursor = [], None
+        while True:
+            params = {"q": "quokkazephyr", "limit": 1, **({"cursor": cursor} if cursor else {})}
+            response = await client.get("/news/search", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            seen += [item["id"] for item in page["items"]]
+            if not page["has_more"]:
+                break
+            cursor = page["next_cursor"]
+
+    assert seen == expected
@@ -0,0 +1,97 @@
+"""
+Media delivery tests
+
+Serve files from a temporary MEDIA_ROOT through the media router alone,
+so they run without redis or database.
+"""
+
+import hashlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.media import routers
+from src.media.cache import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, media_cache
+
+BODY = b"0123456789" * 10
+DIGEST = hashlib.sha256(BODY).hexdigest()
+
+app = FastAPI()
+app.include_router(routers.router)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    media_root = tmp_path / "media"
+    media_root.mkdir()
+    for name in (f"{DIGEST}.png", f"{DIGEST}.thumb.webp", "avatar.png"):
+        (media_root / name).write_bytes(BODY)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(routers, "MEDIA_ROOT_PATH", str(media_root))
+    media_cache.clear()
+    yield TestClient(app)
+    media_cache.clear()
+
+
+def test_content_addressed_file_is_immutable(client):
+    response = client.get(f"/file/media/{DIGEST}.png")
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["etag"] == f'"{DIGEST}"'
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_variant_is_immutable(client):
+    response = client.get(f"/file/media/{DIGEST}.thumb.webp")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["etag"] == f'"{DIGEST}.thumb"'
+
+
+def test_other_files_are_revalidated(client):
+    response = client.get("/file/media/avatar.png")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    assert response.headers["etag"] != f'"{DIGEST}"'
+
+
+def test_range_request(client):
+    response = client.get(f"/file/media/{DIGEST}.png", headers={"Range": "bytes=0-3"})
+    assert response.status_code == 206
+    assert response.content == BODY[:4]
+    assert response.headers["content-range"] == f"bytes 0-3/{len(BODY)}"
+
+
+@pytest.mark.parametrize("path", [f"{DIGEST}.png", "avatar.png"])
+def test_not_modified(client, path):
+    response = client.get(f"/file/media/{path}")
+    assert response.status_code == 200
+
+    not_modified = client.get(f"/file/media/{path}", headers={"If-None-Match": response.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == response.headers["etag"]
+
+    not_modified = client.get(f"/file/media/{path}", headers={"If-Modified-Since": response.headers["last-modified"]})
+    assert not_modified.status_code == 304
+
+
+def test_missing_and_outside_files_are_not_found(client):
+    assert client.get("/file/media/missing.png").status_code == 404
+    assert client.get("/file/media").status_code == 404
+    assert client.get("/file/media/../media/../outside.txt").status_code == 404
+
+
+def test_nginx_delivery(client, monkeypatch):
+    monkeypatch.setattr(routers, "MEDIA_DELIVERY", "nginx")
+
+    response = client.get(f"/file/media/{DIGEST}.png")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == f"{routers.MEDIA_ACCEL_PREFIX}{DIGEST}.png"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert media_cache.get(f"{routers.MEDIA_ROOT_PATH}/{DIGEST}.png").body is None
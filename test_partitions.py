@@ -0,0 +1,74 @@
+"""
+Comment partition maintenance tests
+
+Run against the migrated schema inside transactions that are rolled back,
+so partitions created or detached here never outlive the test.
+"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from src.database import engine
+from src.news.partitions import DEFAULT_PARTITION, detach_partition, get_expired_partitions, get_partitions
+
+# Older than every partition the app creates, so retention always expires it
+OLD_PARTITION = "comment_p2000_01"
+
+
+@pytest_asyncio.fixture(loop_scope="module")
+async def connection():
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            yield connection
+        finally:
+            await transaction.rollback()
+
+
+@pytest_asyncio.fixture(loop_scope="module")
+async def old_comment(connection):
+    await connection.execute(text(
+        f"CREATE TABLE {OLD_PARTITION} PARTITION OF comment FOR VALUES FROM ('2000-01-01') TO ('2000-02-01')"
+    ))
+    await connection.execute(text(
+        """
+        INSERT INTO "user" (id, email, hashed_password, full_name, is_active, is_superuser, is_verified)
+        VALUES (gen_random_uuid(), 'partition_test@example.com', 'x', 'Partition Test', true, false, true)
+        """
+    ))
+    news_id = await connection.scalar(text(
+        "INSERT INTO news (title, content, images, created, updated) "
+        "VALUES ('partitioned news', '', ARRAY[]::varchar[], now(), now()) RETURNING id"
+    ))
+    await connection.execute(
+        text(
+            "INSERT INTO comment (content, created, updated, news_id, user_id) "
+            "SELECT 'old comment', '2000-01-15', '2000-01-15', :news_id, id "
+            "FROM \"user\" WHERE email = 'partition_test@example.com'"
+        ),
+        {"news_id": news_id},
+    )
+    return news_id
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_detach_partition(connection, old_comment):
+    assert await connection.scalar(text("SELECT comment_count FROM news WHERE id = :id"), {"id": old_comment}) == 1
+    assert OLD_PARTITION in await get_expired_partitions(connection, retention_months=1)
+
+    assert await detach_partition(connection, OLD_PARTITION) == [old_comment]
+
+    assert OLD_PARTITION not in await get_partitions(connection)
+    assert await connection.scalar(text(f"SELECT count(*) FROM {OLD_PARTITION}")) == 1
+    assert await connection.scalar(text("SELECT comment_count FROM news WHERE id = :id"), {"id": old_comment}) == 0
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_get_partitions_without_default(connection):
+    partitions = await get_partitions(connection)
+    assert partitions
+    assert DEFAULT_PARTITION not in partitions
+
+    await connection.execute(text(f"ALTER TABLE comment DETACH PARTITION {DEFAULT_PARTITION}"))
+    assert await get_partitions(connection) == partitions
@@ -0,0 +1,133 @@
+"""
+Query plan regression tests
+
+Seeds large news/comment tables inside a transaction that is rolled back,
+runs read services and EXPLAINs every statement DBManager sent to the database.
+A sequential scan over a large table means an index is missing or not usable.
+"""
+
+import re
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import engine
+from src.news.partitions import create_partitions
+from src.news.services import NewsService, CommentService, CategoryService
+
+LARGE_TABLES = {"news", "comment"}
+
+SEED_STATEMENTS = [
+    """
+    INSERT INTO category (name, created)
+    SELECT 'category ' || n, now() - n * interval '1 day'
+    FROM generate_series(1, 100) AS n
+    """,
+    """
+    INSERT INTO "user" (id, email, hashed_password, full_name, is_active, is_superuser, is_verified)
+    VALUES (gen_random_uuid(), 'plan_test@example.com', 'x', 'Plan Test', true, false, true)
+    """,
+    """
+    INSERT INTO news (title, content, images, created, updated, category_id)
+    SELECT 'news ' || n, repeat('content ', 50), ARRAY[]::varchar[],
+           now() - n * interval '1 minute', now() - n * interval '1 minute',
+           (SELECT min(id) FROM category) + n % 100
+    FROM generate_series(1, 50000) AS n
+    """,
+    """
+    INSERT INTO comment (content, created, updated, news_id, user_id)
+    SELECT 'comment ' || n, now() - n * interval '1 second', now() - n * interval '1 second',
+           (SELECT min(id) FROM news) + n % 50000,
+           (SELECT id FROM "user" WHERE email = 'plan_test@example.com')
+    FROM generate_series(1, 200000) AS n
+    """,
+    "ANALYZE category",
+    "ANALYZE news",
+    "ANALYZE comment",
+]
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def seeded():
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await create_partitions(connection, months_ahead=1, since=date.today() - timedelta(days=3))
+        for statement in SEED_STATEMENTS:
+            await connection.execute(text(statement))
+
+        ids = (await connection.execute(text(
+            "SELECT (SELECT max(id) FROM news), (SELECT max(id) FROM comment), (SELECT max(id) FROM category)"
+        ))).one()
+
+        yield connection, {"news_id": ids[0], "comment_id": ids[1], "category_id": ids[2]}
+
+        await transaction.rollback()
+
+
+SERVICE_CALLS = {
+    "news_offset": lambda db, ids: NewsService.get_news(db, offset=100, limit=10),
+    "news_cursor": lambda db, ids: NewsService.get_news(db, pagination="cursor"),
+    "news_by_category": lambda db, ids: NewsService.get_news(
+        db, pagination="cursor", filters={"category_id": ids["category_id"]}
+    ),
+    "news_by_updated": lambda db, ids: NewsService.get_news(db, pagination="cursor", order_by="-updated"),
+    "news_envelope": lambda db, ids: NewsService.get_news(db, offset=100, limit=10, envelope=True),
+    "news_search": lambda db, ids: NewsService.search_news(db, q="12345"),
+    "news_object": lambda db, ids: NewsService.get_news_object(db, news_id=ids["news_id"]),
+    "comments_offset": lambda db, ids: CommentService.get_comments(db, offset=100, limit=10),
+    "comments_cursor": lambda db, ids: CommentService.get_comments(db, pagination="cursor"),
+    "comments_by_date": lambda db, ids: CommentService.get_comments(
+        db, filters={"created__gt": datetime.now() - timedelta(hours=1)}
+    ),
+    "comments_by_news": lambda db, ids: CommentService.get_comments(db, filters={"news_id": ids["news_id"]}),
+    "comment": lambda db, ids: CommentService.get_comment(db, comment_id=ids["comment_id"]),
+    "news_comments": lambda db, ids: CommentService.get_news_comments(db, news_id=ids["news_id"]),
+    "categories": lambda db, ids: CategoryService.get_categories(db),
+    "category": lambda db, ids: CategoryService.get_category(db, category_id=ids["category_id"]),
+}
+
+
+def seq_scans(plan: dict) -> list[str]:
+    """
+    Returns relations sequentially scanned anywhere in the plan tree,
+    partitions are reported as their partitioned table
+    """
+    relations = []
+    if plan["Node Type"] == "Seq Scan":
+        relations.append(re.sub(r"_p\d{4}_\d{2}$", "", plan["Relation Name"]))
+    for child in plan.get("Plans", []):
+        relations += seq_scans(child)
+    return relations
+
+
+@pytest.mark.asyncio(loop_scope="module")
+@pytest.mark.parametrize("name", SERVICE_CALLS)
+async def test_service_queries_use_indexes(seeded, name):
+    connection, ids = seeded
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(connection.sync_connection, "before_cursor_execute", capture)
+    try:
+        async with AsyncSession(bind=connection, join_transaction_mode="create_savepoint") as db:
+            await SERVICE_CALLS[name](db, ids)
+    finally:
+        event.remove(connection.sync_connection, "before_cursor_execute", capture)
+
+    assert statements
+
+    for statement, parameters in statements:
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        scanned = set(seq_scans(plan[0]["Plan"])) & LARGE_TABLES
+        assert not scanned, f"{name} sequentially scans {scanned}:\n{statement}"
@@ -0,0 +1,82 @@
+"""
+Read replica routing tests
+
+Need DB_REPLICA_HOSTS pointing at a second Postgres standing in for the replica
+(e.g. another local instance on a different port), skipped otherwise.
+Requests are sent to a small app using the real session dependencies.
+"""
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import PRIMARY_PIN_COOKIE, async_session, get_db, get_read_db
+from src.environs import DB_REPLICA_HOSTS, DB_READ_YOUR_WRITES_WINDOW
+
+pytestmark = pytest.mark.skipif(
+    not DB_REPLICA_HOSTS or not DB_READ_YOUR_WRITES_WINDOW,
+    reason="DB_REPLICA_HOSTS and DB_READ_YOUR_WRITES_WINDOW are not configured",
+)
+
+SERVER_QUERY = text("SELECT coalesce(inet_server_addr()::text, '') || ':' || current_setting('port')")
+
+app = FastAPI()
+
+
+@app.get("/server")
+async def read_server(db: AsyncSession = Depends(get_read_db)) -> str:
+    return await db.scalar(SERVER_QUERY)
+
+
+@app.post("/write")
+async def write(db: AsyncSession = Depends(get_db)) -> str:
+    server = await db.scalar(SERVER_QUERY)
+    await db.commit()
+    return server
+
+
+@app.post("/fail")
+async def fail(db: AsyncSession = Depends(get_db)) -> None:
+    raise HTTPException(status_code=404, detail="Not found")
+
+
+async def primary_server() -> str:
+    async with async_session() as session:
+        return await session.scalar(SERVER_QUERY)
+
+
+def client() -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_reads_go_to_replica():
+    async with client() as test_client:
+        response = await test_client.get("/server")
+        assert response.status_code == 200
+        assert response.json() != await primary_server()
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_failed_write_does_not_pin_to_primary():
+    async with client() as test_client:
+        response = await test_client.post("/fail")
+        assert response.status_code == 404
+        assert PRIMARY_PIN_COOKIE not in response.cookies
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_write_pins_reads_to_primary():
+    primary = await primary_server()
+
+    async with client() as test_client:
+        response = await test_client.post("/write")
+        assert response.status_code == 200
+        assert response.json() == primary
+        assert PRIMARY_PIN_COOKIE in response.cookies
+
+        response = await test_client.get("/server")
+        assert response.status_code == 200
+        assert response.json() == primary